@@ -1,5 +1,6 @@
 from flask import Blueprint
-from .routes import campaigns, forums, open_trips, tourisms, profiles, sentiments
+from .replica import record_writes, route_reads_to_replica
+from .routes import campaigns, forums, metrics, open_trips, tourisms, profiles, sentiments
 
 v1 = Blueprint("v1", __name__)
 v1.register_blueprint(campaigns.campaigns)
@@ -7,4 +8,9 @@ v1.register_blueprint(forums.forums)
 v1.register_blueprint(open_trips.open_trip)
 v1.register_blueprint(profiles.profiles)
 v1.register_blueprint(tourisms.tourisms)
-v1.register_blueprint(sentiments.sentiments)
\ No newline at end of file
+v1.register_blueprint(sentiments.sentiments)
+v1.register_blueprint(metrics.metrics)
+
+for blueprint in (campaigns.campaigns, forums.forums, open_trips.open_trip, tourisms.tourisms):
+    blueprint.before_request(route_reads_to_replica)
+v1.after_request(record_writes)
\ No newline at end of file
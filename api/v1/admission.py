@@ -0,0 +1,127 @@
+import sys
+from flask import current_app, g, request
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from threading import Condition
+from time import monotonic
+
+class Admission:
+    """Limits how many requests of each lane run at once, with a bounded wait queue per lane.
+
+    Requests outside the "critical" lane may never occupy (run or wait on) more than
+    ADMISSION_THREADS - ADMISSION_CRITICAL_RESERVED threads, so the cheap critical reads
+    always find a free thread when the other lanes are saturated. The lane limits stay below
+    that capacity, the threads left over are where their requests queue."""
+
+    def __init__(self):
+        self.lanes = {}
+        self.capacity = 0
+        self.timeout = 5
+        self.dependency_errors = {"database": 0, "outbound": 0}
+        self._condition = Condition()
+
+    def init_app(self, app):
+        threads = app.config.get("ADMISSION_THREADS", 8)
+        self.capacity = max(1, threads - app.config.get("ADMISSION_CRITICAL_RESERVED", 2))
+        self.timeout = app.config.get("ADMISSION_QUEUE_TIMEOUT", 5)
+        limits = {
+            "critical": threads,
+            "default": app.config.get("ADMISSION_DEFAULT_LIMIT", max(1, self.capacity * 2 // 3)),
+            "external": app.config.get("ADMISSION_EXTERNAL_LIMIT", max(1, self.capacity // 2))
+        }
+        queue_size = app.config.get("ADMISSION_QUEUE_SIZE", threads)
+        self.lanes = {name: {
+            "limit": limit,
+            "queue_size": queue_size,
+            "running": 0,
+            "waiting": 0,
+            "admitted": 0,
+            "queued": 0,
+            "rejected": 0,
+            "timed_out": 0
+        } for name, limit in limits.items()}
+
+        app.before_request(self.admit)
+        app.teardown_request(self.leave)
+        app.register_error_handler(PoolTimeoutError, lambda error: self.shed("database"))
+        # The errors of requests are OSErrors, matched without importing it before an outbound call does
+        app.register_error_handler(OSError, self.shed_outbound)
+
+    def _occupied(self):
+        return sum(lane["running"] + lane["waiting"] for name, lane in self.lanes.items() if name != "critical")
+
+    def acquire(self, name):
+        lane = self.lanes[name]
+        with self._condition:
+            if name != "critical" and self._occupied() >= self.capacity:
+                lane["rejected"] += 1
+                return False
+
+            if lane["running"] >= lane["limit"]:
+                if lane["waiting"] >= lane["queue_size"]:
+                    lane["rejected"] += 1
+                    return False
+
+                lane["waiting"] += 1
+                lane["queued"] += 1
+                deadline = monotonic() + self.timeout
+                try:
+                    while lane["running"] >= lane["limit"]:
+                        remaining = deadline - monotonic()
+                        if remaining <= 0:
+                            lane["timed_out"] += 1
+                            return False
+                        self._condition.wait(remaining)
+                finally:
+                    lane["waiting"] -= 1
+
+            lane["running"] += 1
+            lane["admitted"] += 1
+            return True
+
+    def release(self, name):
+        with self._condition:
+            self.lanes[name]["running"] -= 1
+            self._condition.notify_all()
+
+    def admit(self):
+        view = current_app.view_functions.get(request.endpoint)
+        name = getattr(view, "admission_lane", "default")
+        if name not in self.lanes:
+            return None
+
+        if not self.acquire(name):
+            return self.busy()
+        g.admission_lane = name
+
+    def shed(self, dependency):
+        # The database pool or an outbound service is saturated, answering now is cheaper than piling up
+        with self._condition:
+            self.dependency_errors[dependency] += 1
+        return self.busy()
+
+    def shed_outbound(self, error):
+        requests = sys.modules.get("requests")
+        if requests and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return self.shed("outbound")
+        raise error
+
+    def busy(self):
+        retry_after = current_app.config.get("ADMISSION_RETRY_AFTER", 1)
+        return {"message": "Server is busy, please retry later"}, 503, {"Retry-After": str(retry_after)}
+
+    def leave(self, exception=None):
+        name = g.pop("admission_lane", None)
+        if name:
+            self.release(name)
+
+    def stats(self):
+        with self._condition:
+            return {"lanes": {name: dict(lane) for name, lane in self.lanes.items()}, "dependency_errors": dict(self.dependency_errors)}
+
+def admission_lane(name):
+    """Runs the view in the "critical" lane (cheap reads that must keep answering),
+    the "external" lane (views waiting on outbound services) or the "default" one."""
+    def decorator(func):
+        func.admission_lane = name
+        return func
+    return decorator
@@ -0,0 +1,229 @@
+import msgpack
+import os
+from cachetools import LRUCache
+from collections import defaultdict
+from hashlib import sha1
+from tempfile import mkstemp
+from threading import Lock
+from time import sleep, time, time_ns
+
+class LocalBackend:
+    def __init__(self, max_entries):
+        self._entries = LRUCache(max_entries)
+        self._locks = {}
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at and expires_at < time():
+                del self._entries[key]
+                return None
+            return data
+
+    def set(self, key, data, ttl):
+        with self._lock:
+            self._entries[key] = (time() + ttl if ttl else 0, data)
+
+    def acquire(self, key, ttl):
+        with self._lock:
+            if self._locks.get(key, 0) > time():
+                return False
+            self._locks[key] = time() + ttl
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._locks.pop(key, None)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SharedBackend:
+    """Stores one file per key in a directory shared by every worker on the host, e.g. on /dev/shm."""
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, sha1(key.encode()).hexdigest())
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as file:
+                expires_at, data = msgpack.unpackb(file.read())
+        except (OSError, ValueError):
+            return None
+        if expires_at and expires_at < time():
+            return None
+        return data
+
+    def _write(self, path, data, ttl):
+        fd, temp_path = mkstemp(dir=self.directory, prefix=".")
+        with os.fdopen(fd, "wb") as file:
+            file.write(msgpack.packb([time() + ttl if ttl else 0, data]))
+        os.replace(temp_path, path)
+
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self.prune()
+
+    def get(self, key):
+        return self._read(self._path(key))
+
+    def set(self, key, data, ttl):
+        self._write(self._path(key), data, ttl)
+
+    def acquire(self, key, ttl):
+        path = self._path(key) + ".lock"
+        if os.path.exists(path) and self._read(path) is None:
+            self.delete_path(path)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "wb") as file:
+            file.write(msgpack.packb([time() + ttl, b""]))
+        return True
+
+    def release(self, key):
+        self.delete_path(self._path(key) + ".lock")
+
+    def delete(self, key):
+        self.delete_path(self._path(key))
+
+    def delete_path(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+    def prune(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".") or entry.name.endswith(".lock"):
+                continue
+            if self._read(entry.path) is None:
+                self.delete_path(entry.path)
+            else:
+                entries.append((entry.stat().st_mtime, entry.path))
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self.delete_path(path)
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, data, ttl):
+        self._client.set(key, data, ex=ttl or None)
+
+    def acquire(self, key, ttl):
+        return bool(self._client.set(f"{key}.lock", b"", ex=ttl, nx=True))
+
+    def release(self, key):
+        self._client.delete(f"{key}.lock")
+
+    def delete(self, key):
+        self._client.delete(key)
+
+class Cache:
+    def __init__(self):
+        self.backend = LocalBackend(1024)
+        self.lock_timeout = 10
+        self._locks = {}
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def init_app(self, app):
+        backend = app.config.get("CACHE_BACKEND", "local")
+        max_entries = app.config.get("CACHE_MAX_ENTRIES", 1024)
+        if backend == "shared":
+            self.backend = SharedBackend(app.config.get("CACHE_DIR", "/dev/shm/traversee-cache"), max_entries)
+        elif backend == "redis":
+            self.backend = RedisBackend(app.config["CACHE_URL"])
+        else:
+            self.backend = LocalBackend(max_entries)
+        self.lock_timeout = app.config.get("CACHE_LOCK_TIMEOUT", 10)
+
+    def _record(self, key, hit):
+        self._stats[key.split(":", 1)[0]]["hits" if hit else "misses"] += 1
+
+    def get(self, key, default=None):
+        data = self.backend.get(key)
+        self._record(key, data is not None)
+        return default if data is None else msgpack.unpackb(data)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, msgpack.packb(value), ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def get_or_set(self, key, func, ttl=None):
+        data = self.backend.get(key)
+        if data is not None:
+            self._record(key, True)
+            return msgpack.unpackb(data)
+        self._record(key, False)
+
+        # Only one thread per process and one process per backend recomputes a missing key,
+        # the others wait for its result until the lock times out.
+        lock = self._locks.setdefault(key, Lock())
+        try:
+            with lock:
+                data = self.backend.get(key)
+                if data is not None:
+                    return msgpack.unpackb(data)
+
+                deadline = time() + self.lock_timeout
+                acquired = self.backend.acquire(key, self.lock_timeout)
+                while not acquired and time() < deadline:
+                    sleep(0.05)
+                    data = self.backend.get(key)
+                    if data is not None:
+                        return msgpack.unpackb(data)
+                    acquired = self.backend.acquire(key, self.lock_timeout)
+
+                try:
+                    value = func()
+                    self.set(key, value, ttl)
+                finally:
+                    if acquired:
+                        self.backend.release(key)
+                return value
+        finally:
+            # Another thread may already have replaced the entry with its own lock, that one is left in place
+            if self._locks.get(key) is lock:
+                self._locks.pop(key, None)
+
+    def key(self, namespace, *parts):
+        # A namespace version that was evicted starts over from a new value, so old entries are never reused.
+        version = self.backend.get(f"{namespace}:version")
+        if version is None:
+            version = self.invalidate(namespace)
+        return ":".join([namespace, version.decode(), *map(str, parts)])
+
+    def invalidate(self, namespace):
+        version = str(time_ns()).encode()
+        self.backend.set(f"{namespace}:version", version, None)
+        return version
+
+    def stats(self):
+        stats = {}
+        for namespace, counter in list(self._stats.items()):
+            total = counter["hits"] + counter["misses"]
+            stats[namespace] = {**counter, "hit_ratio": round(counter["hits"] / total, 4) if total else None}
+        return stats
@@ -0,0 +1,96 @@
+import gzip
+import zlib
+from flask import g, request
+from hashlib import sha1
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/plain", "text/csv")
+
+class Compression:
+    def __init__(self):
+        self.config = {}
+
+    def init_app(self, app):
+        self.config = {
+            "min_size": app.config.get("COMPRESS_MIN_SIZE", 1024),
+            "gzip": app.config.get("COMPRESS_LEVEL", 5),
+            "br": app.config.get("COMPRESS_BR_LEVEL", 4),
+            "cached_gzip": app.config.get("COMPRESS_CACHED_LEVEL", 9),
+            "cached_br": app.config.get("COMPRESS_CACHED_BR_LEVEL", 9),
+            "cache_ttl": app.config.get("COMPRESS_CACHE_TTL", 300)
+        }
+        app.after_request(self.compress)
+
+    def negotiate(self, accept_encoding, encodings):
+        accepted = {}
+        for item in accept_encoding.split(","):
+            name, _, params = item.strip().partition(";")
+            quality = params.strip()[2:] if params.strip().startswith("q=") else "1"
+            try:
+                accepted[name.strip().lower()] = float(quality)
+            except ValueError:
+                continue
+        for encoding in encodings:
+            if accepted.get(encoding, accepted.get("*", 0)) > 0 and (encoding != "br" or brotli):
+                return encoding
+        return None
+
+    def encode(self, body, encoding, level):
+        if encoding == "br":
+            return brotli.compress(body, quality=level)
+        return gzip.compress(body, compresslevel=level, mtime=0)
+
+    def encode_stream(self, chunks, level):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        try:
+            for chunk in chunks:
+                # A sync flush sends each chunk as soon as it is ready instead of when zlib's buffer fills up
+                yield compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    def compress(self, response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.status_code in (204, 206, 304) \
+                or "Content-Encoding" in response.headers or response.direct_passthrough:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        accept_encoding = request.headers.get("Accept-Encoding", "")
+        if response.is_streamed:
+            # The size of a streamed body isn't known upfront, so it is always compressed, chunk by chunk
+            if self.negotiate(accept_encoding, ("gzip",)):
+                response.response = self.encode_stream(response.response, self.config["gzip"])
+                response.headers.pop("Content-Length", None)
+                response.headers["Content-Encoding"] = "gzip"
+            return response
+
+        encoding = self.negotiate(accept_encoding, ("br", "gzip"))
+        if encoding is None:
+            return response
+
+        body = response.get_data()
+        if len(body) < self.config["min_size"]:
+            return response
+
+        namespace = g.get("compress_cache")
+        if namespace:
+            from .extensions import cache
+            key = cache.key(namespace, "compressed", encoding, sha1(body).hexdigest())
+            compressed = cache.get_or_set(key, lambda: self.encode(body, encoding, self.config[f"cached_{encoding}"]), self.config["cache_ttl"])
+        else:
+            compressed = self.encode(body, encoding, self.config[encoding])
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+def cache_compressed(namespace):
+    """Marks the response body as coming from the cache namespace, so its compressed bytes are cached along.
+    Only for bodies that are the same for every user, a per-user body would be compressed and stored once per user."""
+    g.compress_cache = namespace
@@ -1,6 +1,7 @@
-from firebase_admin import auth
-from flask import request
+import hmac
+from flask import current_app, request
 from functools import wraps
+from .extensions import clients
 from .helper import parse_token
 
 def authenticated_only(func):
@@ -8,6 +9,7 @@ def authenticated_only(func):
     def wrap(*args, **kwargs):
         if not request.headers.get("Authorization"):
             return {"message": "No credentials provided."}, 401
+        auth = clients.get("auth")
         try:
             _, token = parse_token(request.headers["Authorization"])
             user = auth.verify_id_token(token)
@@ -15,4 +17,16 @@ def authenticated_only(func):
         except:
             return {"message": "Invalid token provided."}, 401
         return func(*args, **kwargs)
-    return wrap
\ No newline at end of file
+    return wrap
+
+def token_only(config_key, header):
+    """Only lets through the requests whose header matches the secret in config_key, none while it is unset."""
+    def decorator(func):
+        @wraps(func)
+        def wrap(*args, **kwargs):
+            secret, token = current_app.config.get(config_key), request.headers.get(header)
+            if not secret or not token or not hmac.compare_digest(token, secret):
+                return {"message": "Invalid token provided."}, 403
+            return func(*args, **kwargs)
+        return wrap
+    return decorator
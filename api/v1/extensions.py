@@ -1,3 +1,74 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from threading import RLock, Thread
+from .admission import Admission
+from .cache import Cache
+from .compression import Compression
+from .profiling import RequestProfiler
+from .replica import RoutingSession
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+cache = Cache()
+admission = Admission()
+compression = Compression()
+request_profiler = RequestProfiler()
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are enabled on each connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+class Clients:
+    def __init__(self):
+        self._factories = {}
+        self._closers = {}
+        self._clients = {}
+        self._lock = RLock()
+
+    def register(self, name, factory, close=None):
+        self._factories[name] = factory
+        if close:
+            self._closers[name] = close
+
+    def get(self, name):
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = self._factories[name]()
+        return client
+
+    def warm_up(self, names):
+        names = [name.strip() for name in (names or "").split(",") if name.strip()]
+        if names:
+            Thread(target=lambda: [self.get(name) for name in names], daemon=True).start()
+
+    def reset(self):
+        self._lock = RLock()
+        for name in list(self._clients):
+            client = self._clients.pop(name)
+            if name in self._closers:
+                self._closers[name](client)
+
+def create_storage_client():
+    from google.cloud import storage
+    return storage.Client()
+
+def create_auth_client():
+    # firebase_admin.auth needs the default app, which main.py registers as the firebase client
+    clients.get("firebase")
+    from firebase_admin import auth
+    return auth
+
+def create_http_session():
+    from requests import Session
+    return Session()
+
+clients = Clients()
+clients.register("storage", create_storage_client)
+clients.register("auth", create_auth_client)
+clients.register("http", create_http_session)
\ No newline at end of file
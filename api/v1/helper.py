@@ -1,4 +1,11 @@
-from google.cloud import storage
+import re
+from decimal import Decimal
+from flask import current_app, stream_with_context
+from hashlib import sha256
+from os import getenv
+from sqlalchemy import literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from .extensions import cache, clients, db
 
 def parse_token(token):
     parsed_token = token.split()
@@ -7,5 +14,176 @@ def parse_token(token):
     return parsed_token
 
 def get_bucket_storage(bucket_name):
-    storage_client = storage.Client()
-    return storage_client.get_bucket(bucket_name)
\ No newline at end of file
+    storage_client = clients.get("storage")
+    return storage_client.bucket(bucket_name)
+
+def upload_image(image, folder):
+    """Stores the image under its SHA-256 digest, so identical images are uploaded only once."""
+    digest = sha256()
+    for chunk in iter(lambda: image.stream.read(1 << 16), b""):
+        digest.update(chunk)
+    image.stream.seek(0)
+
+    blob = get_bucket_storage(getenv("BUCKET_NAME")).blob(f"{folder}/{digest.hexdigest()}.{image.content_type[6:]}")
+    if not cache.get(f"images:{blob.name}") and not blob.exists():
+        # The name changes with the content, so the object can be cached forever
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.upload_from_file(image.stream, content_type=image.content_type, predefined_acl="publicRead")
+    cache.set(f"images:{blob.name}", True)
+    return blob.public_url
+
+def get_user_profiles(user_ids):
+    profiles = {}
+    missing_ids = []
+    for user_id in dict.fromkeys(user_ids):
+        profile = cache.get(f"profiles:{user_id}")
+        if profile is None:
+            missing_ids.append(user_id)
+        else:
+            profiles[user_id] = profile
+
+    for i in range(0, len(missing_ids), 100):
+        auth = clients.get("auth")
+        identifiers = [auth.UidIdentifier(uid) for uid in missing_ids[i:i + 100]]
+        for user in auth.get_users(identifiers).users:
+            profiles[user.uid] = {"display_name": user.display_name, "photo_url": user.photo_url}
+            cache.set(f"profiles:{user.uid}", profiles[user.uid], current_app.config.get("PROFILE_CACHE_TTL", 300))
+    return profiles
+
+def is_id(value, types=int):
+    # bool is a subclass of int, so true would otherwise stand for the id 1
+    return isinstance(value, types) and not isinstance(value, bool)
+
+def apply_link_operations(operations, key, id_type, parent_ids, linked_ids, messages):
+    """Replays POST/DELETE operations on a user's links (likes, favorites) in memory and
+    returns the per-operation results with the links to insert and delete. Ids that aren't
+    an id_type are rejected as malformed rather than looked up."""
+    results = []
+    linked = set(linked_ids)
+    for operation in operations:
+        id, method = operation.get(key), operation.get("method")
+        if method not in ("POST", "DELETE") or not is_id(id, id_type):
+            results.append({key: id, "status": 400, "message": f"{key} and method POST or DELETE are required"})
+        elif id not in parent_ids:
+            results.append({key: id, "status": 404, "message": messages["not_found"].format(id=id)})
+        elif method == "POST" and id in linked:
+            results.append({key: id, "status": 409, "message": messages["already_linked"].format(id=id)})
+        elif method == "DELETE" and id not in linked:
+            results.append({key: id, "status": 409, "message": messages["not_linked"].format(id=id)})
+        else:
+            linked.add(id) if method == "POST" else linked.remove(id)
+            results.append({key: id, "status": 200})
+    return results, linked - set(linked_ids), set(linked_ids) - linked
+
+def dialect_insert(model):
+    # The PostgreSQL and SQLite inserts both support ON CONFLICT and RETURNING
+    insert = postgresql.insert if db.session.get_bind().dialect.name == "postgresql" else sqlite.insert
+    return insert(model.__table__)
+
+def insert_ignoring_duplicates(model):
+    """INSERT that skips the rows whose primary key already exists, so a replayed or racing batch doesn't fail."""
+    primary_key = [column.name for column in model.__table__.primary_key]
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=primary_key)
+
+def insert_link(model, parent_key, parent_id, values, update=()):
+    """Inserts a user's link row (participation, like, favorite) under the parent parent_id in a single
+    INSERT ... SELECT ... ON CONFLICT statement, so nothing is written when the parent doesn't exist
+    and a retried request can't fail on the primary key.
+
+    On a conflict the existing row is kept, or its update columns are overwritten. Returns the written
+    row, None when the parent doesn't exist or the row was already there.
+    """
+    parent = next(iter(parent_key.foreign_keys)).column
+    rows = select(parent, *[literal(value, model.__table__.c[name].type) for name, value in values.items()]) \
+        .where(parent == parent_id)
+    statement = dialect_insert(model).from_select([parent_key.key, *values], rows)
+    primary_key = [column.name for column in model.__table__.primary_key]
+    if update:
+        statement = statement.on_conflict_do_update(index_elements=primary_key, set_={name: statement.excluded[name] for name in update})
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=primary_key)
+    return db.session.execute(statement.returning(*model.__table__.columns)).first()
+
+def stream_list(query, serialize_list=list):
+    """Streams the query results as {"data": [...]}, loading and encoding them in chunks
+    so memory stays bounded however many rows match."""
+    chunk_size = current_app.config.get("STREAM_CHUNK_SIZE", 100)
+
+    def encode(chunk, first):
+        for index, item in enumerate(serialize_list(chunk)):
+            yield ("" if first and index == 0 else ",") + current_app.json.dumps(item)
+
+    def generate():
+        yield '{"data":['
+        chunk, first = [], True
+        for item in query.yield_per(chunk_size):
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                yield from encode(chunk, first)
+                chunk, first = [], False
+        yield from encode(chunk, first)
+        yield "]}"
+
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/json")
+
+PRICE = re.compile(r"(?:rp\.?\s*)?(\d[\d.,]*?)(?:,-)?", re.IGNORECASE)
+MAX_PRICE = Decimal("9999999999.99")
+
+def parse_price(value):
+    """Parses one amount like "Rp 1.500.000", "1,500,000.50" or 1500000 into a Decimal that fits the NUMERIC(12, 2)
+    price column. Anything else raises ValueError, ranges and units like "1-2 juta" or "500rb" included."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a price")
+
+    if isinstance(value, (int, float, Decimal)):
+        price = Decimal(str(value))
+    else:
+        match = PRICE.fullmatch(str(value).strip())
+        if not match:
+            raise ValueError(f"{value!r} is not a price")
+        # A separator followed by exactly three digits groups thousands, any other separates the decimals
+        digits = match.group(1)
+        last = max(digits.rfind("."), digits.rfind(","))
+        whole, fraction = digits, ""
+        if last != -1 and len(digits) - last - 1 != 3:
+            whole, fraction = digits[:last], digits[last + 1:]
+        if not re.fullmatch(r"\d+|[1-9]\d{0,2}([.,])\d{3}(\1\d{3})*", whole) or (fraction and digits[last] in whole):
+            raise ValueError(f"{value!r} is not a price")
+        price = Decimal(f"{re.sub(r'[.,]', '', whole)}.{fraction or 0}")
+
+    if not price.is_finite() or price < 0 or price > MAX_PRICE or price != round(price, 2):
+        raise ValueError(f"{value!r} is not a price between 0 and {MAX_PRICE} with at most 2 decimals")
+    return price
+
+def normalize_search(search):
+    return " ".join(sorted({keyword.lower() for keyword in (search or "").split()}))
+
+def count_facets(rows, category_id, location_id):
+    """Counts the items per category and per location from (category id, category name,
+    location id, location name, count) rows. Each facet ignores its own filter, so the
+    counts show what selecting another category or location would return."""
+    matches = lambda id, selected: not selected or (selected.isdecimal() and id == int(selected))
+    categories, locations, total = {}, {}, 0
+    for row_category_id, category_name, row_location_id, location_name, count in rows:
+        in_category = matches(row_category_id, category_id)
+        in_location = matches(row_location_id, location_id)
+        if in_location:
+            categories.setdefault(row_category_id, {"id": row_category_id, "name": category_name, "count": 0})["count"] += count
+        if in_category:
+            locations.setdefault(row_location_id, {"id": row_location_id, "name": location_name, "count": 0})["count"] += count
+        if in_category and in_location:
+            total += count
+
+    return {
+        "total": total,
+        "categories": sorted(categories.values(), key=lambda category: category["name"]),
+        "locations": sorted(locations.values(), key=lambda location: location["name"])
+    }
+
+def get_operations(request):
+    operations = (request.get_json(silent=True) or {}).get("operations")
+    if not isinstance(operations, list) or not all(isinstance(operation, dict) for operation in operations):
+        return None
+    return operations
\ No newline at end of file
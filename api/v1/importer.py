@@ -0,0 +1,236 @@
+import click
+import csv
+import json
+from datetime import datetime
+from io import StringIO
+from itertools import islice
+from time import perf_counter
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects import sqlite
+from .extensions import db, cache
+from .helper import parse_price
+from .models.campaigns import Campaign, CampaignCategory, CampaignDetails, CampaignLocation
+from .models.open_trips import OpenTrip
+from .models.tourisms import Tourism, TourismCategory, TourismDetail, TourismLocation
+
+importer = AppGroup("import", help="Bulk import tourisms, campaigns and open trips from CSV or JSONL files.")
+
+def text(value):
+    return str(value).strip() if value not in (None, "") else None
+
+def integer(value):
+    return int(value) if value not in (None, "") else None
+
+def day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+def timestamp(value):
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+class Target:
+    """A table loaded from the file rows, upserted on its key or, with replace, deleted and reinserted by it."""
+
+    def __init__(self, model, key, columns, required, references=None, replace=False, optional_on=None):
+        self.table = model.__table__
+        self.key = key
+        self.columns = columns
+        self.required = required
+        self.references = references or {}
+        self.replace = replace
+        self.optional_on = optional_on
+
+    def parse(self, row):
+        values = {column: parse(row.get(field)) for column, (field, parse) in self.columns.items()}
+        if self.optional_on and values[self.optional_on] is None:
+            return None
+        missing = [column for column in self.required if values[column] is None]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        return values
+
+ENTITIES = {
+    "tourisms": [
+        Target(Tourism, "id", {
+            "id": ("id", text),
+            "name": ("name", text),
+            "image_url": ("image_url", text),
+            "location_id": ("location_id", integer),
+            "category_id": ("category_id", integer)
+        }, ["id", "name", "location_id", "category_id"], {"location_id": TourismLocation.id, "category_id": TourismCategory.id}),
+        Target(TourismDetail, "tourism_id", {
+            "tourism_id": ("id", text),
+            "description": ("description", text)
+        }, ["tourism_id"], optional_on="description")
+    ],
+    "campaigns": [
+        Target(Campaign, "id", {
+            "id": ("id", integer),
+            "name": ("name", text),
+            "image_url": ("image_url", text),
+            "location_id": ("location_id", integer),
+            "category_id": ("category_id", integer),
+            "start_date": ("start_date", day),
+            "end_date": ("end_date", day)
+        }, ["id", "name", "image_url", "location_id", "category_id", "start_date", "end_date"], {"location_id": CampaignLocation.id, "category_id": CampaignCategory.id}),
+        Target(CampaignDetails, "campaign_id", {
+            "campaign_id": ("id", integer),
+            "initiator_id": ("initiator_id", text),
+            "description": ("description", text),
+            "terms": ("terms", text),
+            "mission": ("mission", text)
+        }, ["campaign_id", "initiator_id", "description", "terms", "mission"], replace=True, optional_on="description")
+    ],
+    "open-trips": [
+        Target(OpenTrip, "id", {
+            "id": ("id", integer),
+            "title": ("title", text),
+            "description": ("description", text),
+            "price": ("price", parse_price),
+            "organizer": ("organizer", text),
+            "trip_start": ("trip_start", timestamp),
+            "trip_end": ("trip_end", timestamp),
+            "regis_deadline": ("regis_deadline", timestamp),
+            "phone_number": ("phone_number", text)
+        }, ["id", "title", "description", "price", "organizer", "trip_start", "trip_end", "regis_deadline", "phone_number"])
+    ]
+}
+
+def read_rows(file, file_format):
+    if file_format == "csv":
+        yield from enumerate(csv.DictReader(file), start=2)
+    else:
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, None
+
+def read_chunks(rows, chunk_size):
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+def validate_chunk(targets, chunk):
+    loads = {target.table.name: {} for target in targets}
+    errors = []
+    parsed_rows = []
+    for line_number, row in chunk:
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("invalid row")
+            parsed_rows.append((line_number, [target.parse(row) for target in targets]))
+        except (TypeError, ValueError) as error:
+            errors.append((line_number, str(error)))
+
+    existing = {}
+    for index, target in enumerate(targets):
+        for column, reference in target.references.items():
+            ids = {values[index][column] for _, values in parsed_rows if values[index] is not None}
+            existing[column] = {id for id, in db.session.query(reference).filter(reference.in_(ids))}
+
+    for line_number, values in parsed_rows:
+        invalid = [column for target, row in zip(targets, values) if row is not None for column in target.references if row[column] not in existing[column]]
+        if invalid:
+            errors.append((line_number, f"unknown {', '.join(invalid)}"))
+            continue
+        for target, row in zip(targets, values):
+            if row is not None:
+                loads[target.table.name][row[target.key]] = row
+    return loads, errors
+
+def load_rows(target, rows):
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if target.replace:
+        connection.execute(delete(target.table).where(target.table.c[target.key].in_([row[target.key] for row in rows])))
+        if dialect != "postgresql":
+            connection.execute(insert(target.table), rows)
+            return
+
+    columns = list(rows[0])
+    if dialect == "postgresql":
+        copy_rows(connection, target, columns, rows)
+        return
+
+    statement = sqlite.insert(target.table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[target.key],
+        set_={column: statement.excluded[column] for column in columns if column != target.key}
+    )
+    connection.execute(statement, rows)
+
+def copy_rows(connection, target, columns, rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+
+    table = target.table.name
+    column_list = ", ".join(columns)
+    # Columns like created_at only have a client-side default, which the raw INSERT has to render itself
+    compile = lambda default: str(default.arg.compile(dialect=connection.dialect))
+    defaults = {column.name: compile(column.default) for column in target.table.columns
+                if column.name not in columns and column.default is not None and column.default.is_clause_element}
+    onupdates = {column.name: compile(column.onupdate) for column in target.table.columns
+                 if column.name not in columns and column.onupdate is not None and column.onupdate.is_clause_element}
+    insert_list = ", ".join([*columns, *defaults])
+    select_list = ", ".join([*columns, *defaults.values()])
+
+    with connection.connection.cursor() as cursor:
+        # Only the imported columns are staged, without the NOT NULL constraints of the others
+        cursor.execute(f"CREATE TEMP TABLE import_{table} ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA")
+        cursor.copy_expert(f"COPY import_{table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        if target.replace:
+            cursor.execute(f"INSERT INTO {table} ({insert_list}) SELECT {select_list} FROM import_{table}")
+        else:
+            updates = [f"{column} = EXCLUDED.{column}" for column in columns if column != target.key]
+            updates += [f"{column} = {value}" for column, value in onupdates.items()]
+            cursor.execute(f"INSERT INTO {table} ({insert_list}) SELECT {select_list} FROM import_{table} "
+                           f"ON CONFLICT ({target.key}) DO UPDATE SET {', '.join(updates)}")
+
+def reset_sequences(targets):
+    # Rows imported with explicit ids don't advance the serial sequence used by the API inserts
+    for target in targets:
+        key = target.table.c[target.key]
+        if key.primary_key and isinstance(key.type, db.Integer):
+            table = target.table.name
+            db.session.execute(db.text(f"SELECT setval(pg_get_serial_sequence('{table}', '{target.key}'), "
+                                       f"COALESCE((SELECT MAX({target.key}) FROM {table}), 1))"))
+
+@importer.command("data")
+@click.argument("entity", type=click.Choice(list(ENTITIES)))
+@click.argument("file", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]), help="Defaults to the file extension.")
+@click.option("--chunk-size", default=1000, show_default=True, help="Rows validated and loaded per transaction.")
+def import_data(entity, file, file_format, chunk_size):
+    """Stream ENTITY rows from FILE and upsert them in chunks."""
+    targets = ENTITIES[entity]
+    file_format = file_format or ("jsonl" if file.name.endswith((".jsonl", ".json")) else "csv")
+    started_at = perf_counter()
+    total_rows = total_loaded = total_skipped = 0
+
+    for chunk in read_chunks(read_rows(file, file_format), chunk_size):
+        loads, errors = validate_chunk(targets, chunk)
+        for target in targets:
+            rows = list(loads[target.table.name].values())
+            if rows:
+                load_rows(target, rows)
+        db.session.commit()
+
+        for line_number, error in errors:
+            click.echo(f"Skipped line {line_number}: {error}", err=True)
+        total_rows += len(chunk)
+        total_skipped += len(errors)
+        total_loaded += len(chunk) - len(errors)
+        elapsed = perf_counter() - started_at
+        click.echo(f"{total_rows} rows read, {total_loaded} loaded, {total_skipped} skipped ({total_rows / elapsed:.0f} rows/s)", err=True)
+
+    if db.session.connection().dialect.name == "postgresql":
+        reset_sequences(targets)
+        db.session.commit()
+
+    cache.invalidate(entity)
+    click.echo(f"Imported {total_loaded} {entity} in {perf_counter() - started_at:.1f}s, skipped {total_skipped}")
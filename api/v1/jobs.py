@@ -0,0 +1,222 @@
+import click
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup
+from os import getenv
+from sqlalchemy import update
+from threading import Condition, Thread
+from time import sleep
+from .extensions import cache, clients, db
+from .models.forums import Comment, Forum, SentimentJob
+
+class MemoryBackend:
+    """Keeps the jobs in the process, for development and tests. They are lost on restart."""
+
+    def __init__(self):
+        self.jobs = deque()
+        self.next_id = 0
+        self.condition = Condition()
+
+    def push(self, kind, target_ids):
+        with self.condition:
+            for target_id in target_ids:
+                self.next_id += 1
+                self.jobs.append({"id": self.next_id, "kind": kind, "target_id": target_id, "attempts": 0, "available_at": datetime.now()})
+            self.condition.notify()
+
+    def claim(self, limit, lease):
+        with self.condition:
+            now = datetime.now()
+            claimed, waiting = [], deque()
+            while self.jobs:
+                job = self.jobs.popleft()
+                if len(claimed) < limit and job["available_at"] <= now:
+                    claimed.append(job)
+                else:
+                    waiting.append(job)
+            self.jobs = waiting
+            return claimed
+
+    def complete(self, jobs):
+        pass
+
+    def retry(self, job, delay):
+        with self.condition:
+            self.jobs.append({**job, "attempts": job["attempts"] + 1, "available_at": datetime.now() + timedelta(seconds=delay)})
+
+    def wait(self, timeout):
+        with self.condition:
+            if self.jobs:
+                # Wake up for the retry that is due first
+                timeout = min(timeout, max(0, min(job["available_at"] for job in self.jobs).timestamp() - datetime.now().timestamp()))
+            self.condition.wait(timeout)
+
+class DatabaseBackend:
+    """Keeps the jobs in the sentiment_jobs table, so a separate worker process can run them.
+
+    A claimed job is leased rather than deleted, so the jobs of a worker that dies are claimed again once the lease ends.
+    """
+
+    def push(self, kind, target_ids):
+        db.session.add_all([SentimentJob(kind=kind, target_id=target_id, attempts=0, available_at=datetime.now()) for target_id in target_ids])
+        db.session.commit()
+
+    def claim(self, limit, lease):
+        now = datetime.now()
+        jobs = db.session.query(SentimentJob) \
+            .filter(SentimentJob.available_at <= now) \
+            .order_by(SentimentJob.id.asc()) \
+            .limit(limit).with_for_update(skip_locked=True).all()
+        for job in jobs:
+            job.available_at = now + timedelta(seconds=lease)
+        db.session.commit()
+        return [{"id": job.id, "kind": job.kind, "target_id": job.target_id, "attempts": job.attempts} for job in jobs]
+
+    def complete(self, jobs):
+        if jobs:
+            db.session.query(SentimentJob).filter(SentimentJob.id.in_([job["id"] for job in jobs])).delete()
+            db.session.commit()
+
+    def retry(self, job, delay):
+        db.session.query(SentimentJob).filter_by(id=job["id"]) \
+            .update({"attempts": job["attempts"] + 1, "available_at": datetime.now() + timedelta(seconds=delay)})
+        db.session.commit()
+
+    def wait(self, timeout):
+        sleep(timeout)
+
+class SentimentQueue:
+    def __init__(self):
+        self.app = None
+        self.backend = None
+        self.config = {}
+        self.thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.config = {
+            "batch_size": app.config.get("SENTIMENT_BATCH_SIZE", 20),
+            "concurrency": app.config.get("SENTIMENT_CONCURRENCY", 4),
+            "max_attempts": app.config.get("SENTIMENT_MAX_ATTEMPTS", 5),
+            "retry_delay": app.config.get("SENTIMENT_RETRY_DELAY", 30),
+            "lease": app.config.get("SENTIMENT_LEASE", 300)
+        }
+        backend = app.config.get("SENTIMENT_QUEUE")
+        if backend == "memory":
+            self.backend = MemoryBackend()
+        elif backend == "database":
+            self.backend = DatabaseBackend()
+        elif backend:
+            raise ValueError(f"Unknown SENTIMENT_QUEUE {backend}, expected memory or database")
+
+    def enqueue(self, kind, target_ids):
+        if self.backend is None:
+            return
+        self.backend.push(kind, target_ids)
+        # The in-process backend is worked by a thread of the process itself, started again after a fork
+        if isinstance(self.backend, MemoryBackend) and not (self.thread and self.thread.is_alive()):
+            self.thread = Thread(target=self.work, daemon=True)
+            self.thread.start()
+
+    def work(self, once=False, poll_interval=2):
+        with self.app.app_context():
+            while True:
+                try:
+                    processed = self.run_batch()
+                except Exception:
+                    current_app.logger.exception("Sentiment batch failed")
+                    db.session.rollback()
+                    processed = 0
+                finally:
+                    db.session.remove()
+                if once and not processed:
+                    return
+                if not processed:
+                    self.backend.wait(poll_interval)
+
+    def run_batch(self):
+        jobs = self.backend.claim(self.config["batch_size"], self.config["lease"])
+        if not jobs:
+            return 0
+
+        texts = load_texts(jobs)
+        timeout = current_app.config.get("OUTBOUND_TIMEOUT", 10)
+        with ThreadPoolExecutor(self.config["concurrency"]) as executor:
+            results = list(executor.map(lambda job: analyze(texts.get((job["kind"], job["target_id"])), timeout), jobs))
+
+        done, failed = [], []
+        for job, (ok, sentiment) in zip(jobs, results):
+            if ok:
+                done.append((job, sentiment))
+            else:
+                failed.append(job)
+        store_sentiments(done)
+        self.backend.complete([job for job, _ in done])
+
+        for job in failed:
+            if job["attempts"] + 1 >= self.config["max_attempts"]:
+                current_app.logger.warning("Giving up sentiment of %s %s after %s attempts", job["kind"], job["target_id"], job["attempts"] + 1)
+                self.backend.complete([job])
+            else:
+                self.backend.retry(job, self.config["retry_delay"] * 2 ** job["attempts"])
+        return len(jobs)
+
+def load_texts(jobs):
+    forum_ids = [job["target_id"] for job in jobs if job["kind"] == "forum"]
+    comment_ids = [job["target_id"] for job in jobs if job["kind"] == "comment"]
+    texts = {("forum", id): f"{title} {text}" for id, title, text in db.session.query(Forum.id, Forum.title, Forum.text).filter(Forum.id.in_(forum_ids))}
+    texts.update({("comment", id): text for id, text in db.session.query(Comment.id, Comment.text).filter(Comment.id.in_(comment_ids))})
+    return texts
+
+def analyze(text, timeout):
+    """Returns whether the job is done and the sentiment to store. Deleted rows are done without a sentiment."""
+    if text is None:
+        return True, None
+    try:
+        response = clients.get("http").get(f"{getenv('SENTIMENTS_SERVICE')}/analyze_sentiment", params={"words": text}, timeout=timeout)
+    except Exception:
+        return False, None
+    if response.status_code != 200:
+        return False, None
+    body = response.json()
+    return True, body.get("data", body) if isinstance(body, dict) else body
+
+def store_sentiments(done):
+    rows = {"forum": [], "comment": []}
+    for job, sentiment in done:
+        if sentiment is not None:
+            rows[job["kind"]].append({"id": job["target_id"], "sentiment": sentiment})
+    if rows["forum"]:
+        db.session.execute(update(Forum), rows["forum"])
+    if rows["comment"]:
+        db.session.execute(update(Comment), rows["comment"])
+    db.session.commit()
+    if rows["forum"] or rows["comment"]:
+        cache.invalidate("forums")
+
+sentiment_queue = SentimentQueue()
+
+sentiment_jobs = AppGroup("sentiment", help="Work the queue of forums and comments waiting for their sentiment.")
+
+@sentiment_jobs.command("work")
+@click.option("--once", is_flag=True, help="Stop once the queue is empty instead of polling it.")
+@click.option("--poll-interval", default=2.0, show_default=True, help="Seconds to wait for new jobs when the queue is empty.")
+def work(once, poll_interval):
+    """Send the queued forums and comments to the sentiment service and store the results."""
+    if sentiment_queue.backend is None:
+        raise click.ClickException("SENTIMENT_QUEUE is not configured")
+    sentiment_queue.work(once, poll_interval)
+
+@sentiment_jobs.command("backfill")
+def backfill():
+    """Queue the forums and comments that have no sentiment yet."""
+    if sentiment_queue.backend is None:
+        raise click.ClickException("SENTIMENT_QUEUE is not configured")
+
+    forum_ids = [id for id, in db.session.query(Forum.id).filter(Forum.sentiment.is_(None))]
+    comment_ids = [id for id, in db.session.query(Comment.id).filter(Comment.sentiment.is_(None))]
+    sentiment_queue.enqueue("forum", forum_ids)
+    sentiment_queue.enqueue("comment", comment_ids)
+    click.echo(f"Queued {len(forum_ids)} forums and {len(comment_ids)} comments")
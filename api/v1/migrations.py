@@ -0,0 +1,115 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Numeric, inspect, text
+from sqlalchemy.schema import CreateTable
+from .extensions import db
+from .helper import parse_price
+
+migrations = AppGroup("migrate", help="Apply the schema changes that db.create_all can't make to an existing database.")
+
+MIGRATIONS = []
+
+def migration(func):
+    MIGRATIONS.append(func)
+    return func
+
+def replace_foreign_key(connection, table, column, referred, ondelete):
+    # Constraints created by db.create_all on PostgreSQL are named <table>_<column>_fkey
+    name = f"{table}_{column}_fkey"
+    connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}"))
+    connection.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred} ON DELETE {ondelete}"))
+
+@migration
+def cascade_forum_and_trip_deletes(connection):
+    if connection.dialect.name != "postgresql":
+        # SQLite can't alter constraints, rebuild_sqlite_cascades recreates the tables instead
+        return
+    replace_foreign_key(connection, "comments", "forum_id", "forums (id)", "CASCADE")
+    replace_foreign_key(connection, "forum_likes", "forum_id", "forums (id)", "CASCADE")
+    replace_foreign_key(connection, "forum_campaigns", "forum_id", "forums (id)", "CASCADE")
+    replace_foreign_key(connection, "trip_destinations", "trip_id", "open_trips (id)", "CASCADE")
+
+@migration
+def add_sentiment_columns(connection):
+    inspector = inspect(connection)
+    for table in ("forums", "comments"):
+        if "sentiment" not in {column["name"] for column in inspector.get_columns(table)}:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN sentiment {db.JSON().compile(dialect=connection.dialect)}"))
+
+@migration
+def convert_trip_prices(connection):
+    price = next(column for column in inspect(connection).get_columns("open_trips") if column["name"] == "price")
+    if not isinstance(price["type"], Numeric):
+        invalid, values = [], []
+        for id, value in connection.execute(text("SELECT id, price FROM open_trips")):
+            try:
+                values.append({"id": id, "price": str(parse_price(value))})
+            except ValueError:
+                invalid.append(str(id))
+        if invalid:
+            raise click.ClickException(f"The prices of the open trips {', '.join(invalid)} aren't numbers, fix them and upgrade again")
+
+        connection.execute(text("ALTER TABLE open_trips ADD COLUMN price_value NUMERIC(12, 2)"))
+        if values:
+            connection.execute(text("UPDATE open_trips SET price_value = :price WHERE id = :id"), values)
+        connection.execute(text("ALTER TABLE open_trips DROP COLUMN price"))
+        connection.execute(text("ALTER TABLE open_trips RENAME COLUMN price_value TO price"))
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE open_trips ALTER COLUMN price SET NOT NULL"))
+
+    for column in ("price", "trip_start", "trip_end", "regis_deadline"):
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_open_trips_{column} ON open_trips ({column})"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_trip_destinations_category_trip_id ON trip_destinations (category, trip_id)"))
+
+def rebuild_sqlite_table(connection, table):
+    # The table is copied into a new one created from the model, then renamed back, as SQLite documents for schema changes
+    orphans = connection.execute(text(f"PRAGMA foreign_key_check({table.name})")).all()
+    if orphans:
+        raise click.ClickException(f"{len(orphans)} rows of {table.name} reference missing rows, delete them and upgrade again")
+
+    columns = ", ".join(column["name"] for column in inspect(connection).get_columns(table.name) if column["name"] in table.c)
+    create = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {table.name}_new ", 1))
+    connection.exec_driver_sql(f"INSERT INTO {table.name}_new ({columns}) SELECT {columns} FROM {table.name}")
+    connection.exec_driver_sql(f"DROP TABLE {table.name}")
+    connection.exec_driver_sql(f"ALTER TABLE {table.name}_new RENAME TO {table.name}")
+    for index in table.indexes:
+        index.create(connection)
+
+@migration
+def rebuild_sqlite_cascades(connection):
+    if connection.dialect.name != "sqlite":
+        return
+    # Deletes rely on ON DELETE CASCADE now that foreign keys are enforced, tables created before it would refuse them
+    for name, column in (("comments", "forum_id"), ("forum_likes", "forum_id"), ("forum_campaigns", "forum_id"), ("trip_destinations", "trip_id")):
+        foreign_keys = inspect(connection).get_foreign_keys(name)
+        if not any(foreign_key["constrained_columns"] == [column] and foreign_key["options"].get("ondelete", "").upper() == "CASCADE"
+                   for foreign_key in foreign_keys):
+            rebuild_sqlite_table(connection, db.metadata.tables[name])
+
+def get_applied(connection):
+    connection.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"))
+    return {name for name, in connection.execute(text("SELECT name FROM schema_migrations"))}
+
+@migrations.command("upgrade")
+def upgrade():
+    """Apply the pending migrations, each in its own transaction."""
+    db.create_all()
+    with db.engine.begin() as connection:
+        applied = get_applied(connection)
+
+    for func in MIGRATIONS:
+        if func.__name__ in applied:
+            continue
+        with db.engine.begin() as connection:
+            func(connection)
+            connection.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": func.__name__})
+        click.echo(f"Applied {func.__name__}")
+
+@migrations.command("status")
+def status():
+    """List the migrations and whether they are applied."""
+    with db.engine.begin() as connection:
+        applied = get_applied(connection)
+    for func in MIGRATIONS:
+        click.echo(f"{'applied' if func.__name__ in applied else 'pending'}  {func.__name__}")
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import date
-from firebase_admin import auth
-from ..extensions import db
+from ..extensions import clients, db
+from ..helper import get_user_profiles
 
 @dataclass
 class Campaign(db.Model):
@@ -64,7 +64,45 @@ class Campaign(db.Model):
     
     @staticmethod
     def serialize_list(user_id, campaigns):
-        return [campaign.serialize(user_id) for campaign in campaigns]
+        return Campaign.overlay_registrations(user_id, Campaign.extract_list(campaigns))
+
+    @staticmethod
+    def extract_list(campaigns):
+        campaigns = list(campaigns)
+        campaigns_id = [campaign.id for campaign in campaigns]
+        categories = dict(db.session.query(CampaignCategory.id, CampaignCategory.name) \
+            .filter(CampaignCategory.id.in_({campaign.category_id for campaign in campaigns})))
+        locations = dict(db.session.query(CampaignLocation.id, CampaignLocation.name) \
+            .filter(CampaignLocation.id.in_({campaign.location_id for campaign in campaigns})))
+        total_participants = dict(db.session.query(CampaignParticipant.campaign_id, db.func.count()) \
+            .filter(CampaignParticipant.campaign_id.in_(campaigns_id)).group_by(CampaignParticipant.campaign_id))
+
+        return [{
+            "campaign": Campaign.extract(campaign, categories.get(campaign.category_id), locations.get(campaign.location_id),
+                                         total_participants.get(campaign.id, 0))
+        } for campaign in campaigns]
+
+    @staticmethod
+    def extract(campaign, category_name, location_name, total_participants):
+        return {
+            "id": campaign.id,
+            "name": campaign.name,
+            "image_url": campaign.image_url,
+            "category_id": campaign.category_id,
+            "status": campaign.status,
+            "start_date": campaign.start_date,
+            "end_date": campaign.end_date,
+            "category_name": category_name,
+            "location_name": location_name,
+            "total_participants": total_participants
+        }
+
+    @staticmethod
+    def overlay_registrations(user_id, campaigns_extracted):
+        campaigns_id = [campaign["campaign"]["id"] for campaign in campaigns_extracted]
+        registered_id = {campaign_id for campaign_id, in db.session.query(CampaignParticipant.campaign_id) \
+            .filter(CampaignParticipant.user_id == user_id, CampaignParticipant.campaign_id.in_(campaigns_id))}
+        return [{**campaign, "is_registered": campaign["campaign"]["id"] in registered_id} for campaign in campaigns_extracted]
 
 @dataclass
 class CampaignDetails(db.Model):
@@ -81,6 +119,7 @@ class CampaignDetails(db.Model):
 
     @property
     def initiator_name(self):
+        auth = clients.get("auth")
         initiator = auth.get_user(uid=self.initiator_id)
         return initiator.display_name
     
@@ -120,6 +159,7 @@ class CampaignWinner(db.Model):
     
     @property
     def user_display_name(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.user_id)
             return user.display_name
@@ -128,6 +168,7 @@ class CampaignWinner(db.Model):
     
     @property
     def user_profile_image(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.user_id)
             return user.photo_url
@@ -148,6 +189,7 @@ class CampaignParticipant(db.Model):
 
     @property
     def user_display_name(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.user_id)
             return user.display_name
@@ -156,12 +198,32 @@ class CampaignParticipant(db.Model):
     
     @property
     def user_profile_image(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.user_id)
             return user.photo_url
         except auth.UserNotFoundError:
             return None
 
+    @staticmethod
+    def serialize_list(participants, profiles=None):
+        if profiles is None:
+            profiles = get_user_profiles([participant.user_id for participant, _ in participants])
+        winners, other_participants = [], []
+        for participant, position in participants:
+            user = profiles.get(participant.user_id)
+            participant_extracted = {
+                "user_id": participant.user_id,
+                "submission_url": participant.submission_url,
+                "user_display_name": user["display_name"] if user else None,
+                "user_profile_image": user["photo_url"] if user else None
+            }
+            if position is None:
+                other_participants.append(participant_extracted)
+            else:
+                winners.append({**participant_extracted, "position": position})
+        return [{"winners": winners}, {"other_participants": other_participants}]
+
 @dataclass
 class CampaignCategory(db.Model):
     __tablename__ = "campaign_categories"
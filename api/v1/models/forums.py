@@ -1,7 +1,8 @@
 from dataclasses import dataclass
-from firebase_admin import auth
-from ..models.campaigns import Campaign
-from ..extensions import db
+from datetime import datetime
+from ..models.campaigns import Campaign, CampaignCategory
+from ..extensions import clients, db
+from ..helper import get_user_profiles
 
 @dataclass
 class Forum(db.Model):
@@ -18,9 +19,10 @@ class Forum(db.Model):
     text: str = db.Column(db.String(500), nullable=False)
     author_id: str = db.Column(db.String, nullable=False)
     image_url: str = db.Column(db.String)
-    comments = db.relationship('Comment', cascade="all, delete", uselist=True)
-    likes = db.relationship('ForumLike', cascade="all, delete", uselist=True)
-    campaigns = db.relationship('ForumCampaign', cascade="all, delete", uselist=False)
+    sentiment: dict = db.Column(db.JSON(none_as_null=True))
+    comments = db.relationship('Comment', cascade="all, delete", passive_deletes=True, uselist=True)
+    likes = db.relationship('ForumLike', cascade="all, delete", passive_deletes=True, uselist=True)
+    campaigns = db.relationship('ForumCampaign', cascade="all, delete", passive_deletes=True, uselist=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
 
     @property
@@ -33,6 +35,7 @@ class Forum(db.Model):
 
     @property
     def user_display_name(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.author_id)
             return user.display_name
@@ -41,6 +44,7 @@ class Forum(db.Model):
     
     @property
     def user_profile_image(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.author_id)
             return user.photo_url
@@ -71,20 +75,77 @@ class Forum(db.Model):
     
     @staticmethod
     def serialize_list(user_id, forums):
-        return [forum.serialize(user_id) for forum in forums]
+        return Forum.overlay_likes(user_id, Forum.extract_list(forums))
+
+    @staticmethod
+    def extract_list(forums):
+        forums = list(forums)
+        forums_id = [forum.id for forum in forums]
+        total_likes = dict(db.session.query(ForumLike.forum_id, db.func.count()) \
+            .filter(ForumLike.forum_id.in_(forums_id)).group_by(ForumLike.forum_id))
+        total_comments = dict(db.session.query(Comment.forum_id, db.func.count()) \
+            .filter(Comment.forum_id.in_(forums_id)).group_by(Comment.forum_id))
+        campaigns = db.session.query(ForumCampaign.forum_id, Campaign.id, Campaign.name, CampaignCategory.name, Campaign.image_url) \
+            .join(Campaign, Campaign.id == ForumCampaign.campaign_id) \
+            .join(CampaignCategory, CampaignCategory.id == Campaign.category_id) \
+            .filter(ForumCampaign.forum_id.in_(forums_id))
+        campaigns_extracted = {forum_id: {"id": id, "name": name, "category": category, "image_url": image_url}
+                               for forum_id, id, name, category, image_url in campaigns}
+        profiles = get_user_profiles([forum.author_id for forum in forums])
+
+        return [{
+            "forum": Forum.extract(forum, total_likes.get(forum.id, 0), total_comments.get(forum.id, 0), profiles),
+            "campaign": campaigns_extracted.get(forum.id)
+        } for forum in forums]
+
+    @staticmethod
+    def extract(forum, total_likes, total_comments, profiles):
+        return {
+            "id": forum.id,
+            "title": forum.title,
+            "text": forum.text,
+            "author_id": forum.author_id,
+            "image_url": forum.image_url,
+            "sentiment": forum.sentiment,
+            "total_likes": total_likes,
+            "total_comments": total_comments,
+            "user_display_name": profiles[forum.author_id]["display_name"] if forum.author_id in profiles else None,
+            "user_profile_image": profiles[forum.author_id]["photo_url"] if forum.author_id in profiles else None,
+            "created_date": forum.created_date
+        }
+
+    @staticmethod
+    def extract_one(id):
+        """Loads the forum with its like and comment counts in a single query, None when it doesn't exist."""
+        total_likes = db.session.query(db.func.count(ForumLike.user_id)) \
+            .filter(ForumLike.forum_id == Forum.id).scalar_subquery()
+        total_comments = db.session.query(db.func.count(Comment.id)) \
+            .filter(Comment.forum_id == Forum.id).scalar_subquery()
+        row = db.session.query(Forum, total_likes, total_comments).filter(Forum.id == id).first()
+        if not row:
+            return None
+        forum, likes, comments = row
+        return Forum.extract(forum, likes, comments, get_user_profiles([forum.author_id]))
+
+    @staticmethod
+    def overlay_likes(user_id, forums_extracted):
+        forums_id = [forum["forum"]["id"] for forum in forums_extracted]
+        liked_id = {forum_id for forum_id, in db.session.query(ForumLike.forum_id) \
+            .filter(ForumLike.user_id == user_id, ForumLike.forum_id.in_(forums_id))}
+        return [{**forum, "is_liked": forum["forum"]["id"] in liked_id} for forum in forums_extracted]
 
 @dataclass
 class ForumLike(db.Model):
     __tablename__ = "forum_likes"
 
-    forum_id: int = db.Column(db.ForeignKey('forums.id'), primary_key=True)
+    forum_id: int = db.Column(db.ForeignKey('forums.id', ondelete="CASCADE"), primary_key=True)
     user_id: str = db.Column(db.String, primary_key=True)
 
 @dataclass
 class ForumCampaign(db.Model):
     __tablename__ = "forum_campaigns"
 
-    forum_id: int = db.Column(db.ForeignKey('forums.id'), primary_key=True)
+    forum_id: int = db.Column(db.ForeignKey('forums.id', ondelete="CASCADE"), primary_key=True)
     campaign_id: int = db.Column(db.ForeignKey('campaigns.id'), nullable=False)
 
 @dataclass
@@ -98,11 +159,13 @@ class Comment(db.Model):
     id: int = db.Column(db.Integer, primary_key=True)
     text: str = db.Column(db.String(300), nullable=False)
     author_id: str = db.Column(db.String, nullable=False)
-    forum_id: int = db.Column(db.Integer, db.ForeignKey('forums.id'), nullable=False)
+    forum_id: int = db.Column(db.Integer, db.ForeignKey('forums.id', ondelete="CASCADE"), nullable=False)
+    sentiment: dict = db.Column(db.JSON(none_as_null=True))
     created_at = db.Column(db.DateTime, default=db.func.now())
 
     @property
     def user_display_name(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.author_id)
             return user.display_name
@@ -111,6 +174,7 @@ class Comment(db.Model):
     
     @property
     def user_profile_image(self):
+        auth = clients.get("auth")
         try:
             user = auth.get_user(uid=self.author_id)
             return user.photo_url
@@ -119,4 +183,13 @@ class Comment(db.Model):
         
     @property
     def created_date(self):
-        return self.created_at.strftime("%d %B %Y")
\ No newline at end of file
+        return self.created_at.strftime("%d %B %Y")
+
+class SentimentJob(db.Model):
+    __tablename__ = "sentiment_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
@@ -12,12 +12,12 @@ class OpenTrip(db.Model):
     id: int = db.Column(db.Integer, primary_key=True)
     title: str = db.Column(db.String(100), nullable=False)
     description: str = db.Column(db.String, nullable=False)
-    price: str = db.Column(db.String(20), nullable=False)
+    price: float = db.Column(db.Numeric(12, 2, asdecimal=False), nullable=False, index=True)
     organizer: str = db.Column(db.String(50), nullable=False)
-    trip_start: str = db.Column(db.DateTime, nullable=False)
-    trip_end: str = db.Column(db.DateTime, nullable=False)
-    regis_deadline: str = db.Column(db.DateTime, nullable=False)
-    destinations = db.relationship('TripDestination', uselist=True)
+    trip_start: str = db.Column(db.DateTime, nullable=False, index=True)
+    trip_end: str = db.Column(db.DateTime, nullable=False, index=True)
+    regis_deadline: str = db.Column(db.DateTime, nullable=False, index=True)
+    destinations = db.relationship('TripDestination', cascade="all, delete", passive_deletes=True, uselist=True)
     phone_number: str = db.Column(db.String(15), nullable=False)
 
     @property
@@ -39,10 +39,11 @@ class OpenTrip(db.Model):
 @dataclass
 class TripDestination(db.Model):
     __tablename__ = "trip_destinations"
+    __table_args__ = (db.Index("ix_trip_destinations_category_trip_id", "category", "trip_id"),)
 
     id: int = db.Column(db.Integer, primary_key=True)
     name: str = db.Column(db.String(50), nullable=False)
     location_name: str = db.Column(db.String(100))
     image_url: str = db.Column(db.String)
     category: str = db.Column(db.String(20))
-    trip_id: int = db.Column(db.Integer, db.ForeignKey('open_trips.id'), nullable=False)
\ No newline at end of file
+    trip_id: int = db.Column(db.Integer, db.ForeignKey('open_trips.id', ondelete="CASCADE"), nullable=False)
\ No newline at end of file
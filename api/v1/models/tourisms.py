@@ -33,7 +33,44 @@ class Tourism(db.Model):
     
     @staticmethod
     def serialize_list(user_id, tourisms):
-        return [tourism.serialize(user_id) for tourism in tourisms]
+        return Tourism.overlay_favorites(user_id, Tourism.extract_list(tourisms))
+
+    @staticmethod
+    def extract_list(tourisms):
+        tourisms = list(tourisms)
+        categories = dict(db.session.query(TourismCategory.id, TourismCategory.name) \
+            .filter(TourismCategory.id.in_({tourism.category_id for tourism in tourisms})))
+        locations = dict(db.session.query(TourismLocation.id, TourismLocation.name) \
+            .filter(TourismLocation.id.in_({tourism.location_id for tourism in tourisms})))
+
+        return [{
+            "tourism": {
+                "id": tourism.id,
+                "name": tourism.name,
+                "image_url": tourism.image_url,
+                "category_name": categories.get(tourism.category_id),
+                "location_name": locations.get(tourism.location_id)
+            }
+        } for tourism in tourisms]
+
+    @staticmethod
+    def extract_one(id):
+        """Loads the tourism with its category and location names in a single query, None when it doesn't exist."""
+        row = db.session.query(Tourism.id, Tourism.name, Tourism.image_url, TourismCategory.name, TourismLocation.name) \
+            .join(TourismCategory, TourismCategory.id == Tourism.category_id) \
+            .join(TourismLocation, TourismLocation.id == Tourism.location_id) \
+            .filter(Tourism.id == id).first()
+        if not row:
+            return None
+        id, name, image_url, category_name, location_name = row
+        return {"id": id, "name": name, "image_url": image_url, "category_name": category_name, "location_name": location_name}
+
+    @staticmethod
+    def overlay_favorites(user_id, tourisms_extracted):
+        tourisms_id = [tourism["tourism"]["id"] for tourism in tourisms_extracted]
+        favorite_id = {tourism_id for tourism_id, in db.session.query(TourismFavorite.tourism_id) \
+            .filter(TourismFavorite.user_id == user_id, TourismFavorite.tourism_id.in_(tourisms_id))}
+        return [{**tourism, "is_favorite": tourism["tourism"]["id"] in favorite_id} for tourism in tourisms_extracted]
 
 @dataclass
 class TourismDetail(db.Model):
@@ -0,0 +1,269 @@
+import click
+import cProfile
+import hmac
+import json
+import pstats
+import random
+import re
+import sys
+from flask import current_app, request
+from flask.cli import AppGroup
+from functools import wraps
+from os import listdir, makedirs, path, remove
+from threading import Event, Lock, Thread, get_ident, local
+from time import perf_counter, time
+from uuid import uuid4
+
+FIREBASE_CALLS = ("verify_id_token", "get_user", "get_users", "update_user")
+
+class StackSampler(Thread):
+    """Samples the call stack of a thread every interval seconds and counts them as folded stacks."""
+
+    def __init__(self, thread_id, interval, root_code):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks = {}
+        self.stopped = Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame.f_code is not self.root_code:
+                stack.append(f"{frame.f_code.co_name} ({path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                folded = ";".join(reversed(stack))
+                self.stacks[folded] = self.stacks.get(folded, 0) + 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+class RequestProfiler:
+    def __init__(self):
+        self.config = {}
+        self.local = local()
+        # Only one cProfile profiler can be active at a time since Python 3.12
+        self.cprofile_lock = Lock()
+
+    def init_app(self, app):
+        self.config = {
+            "directory": app.config.get("PROFILE_DIR"),
+            "token": app.config.get("PROFILE_TOKEN"),
+            "sample_rate": app.config.get("PROFILE_SAMPLE_RATE", 0),
+            "mode": app.config.get("PROFILE_MODE", "sample"),
+            "interval": app.config.get("PROFILE_INTERVAL", 0.005),
+            "keep": app.config.get("PROFILE_KEEP", 100)
+        }
+        # Nothing is wrapped or listened to unless profiles can be triggered
+        if not self.config["directory"] or not (self.config["token"] or self.config["sample_rate"]):
+            return
+
+        for endpoint, view in app.view_functions.items():
+            if endpoint != "static":
+                app.view_functions[endpoint] = self.wrap(view)
+        self.instrument_sql()
+        self.instrument_firebase()
+
+    def wrap(self, view):
+        @wraps(view)
+        def profiled(*args, **kwargs):
+            if not self.triggered():
+                return view(*args, **kwargs)
+            if self.config["mode"] != "cprofile":
+                return self.profile_view(view, args, kwargs)
+            if not self.cprofile_lock.acquire(blocking=False):
+                return view(*args, **kwargs)
+            try:
+                return self.profile_view(view, args, kwargs)
+            finally:
+                self.cprofile_lock.release()
+        return profiled
+
+    def triggered(self):
+        token = request.headers.get("X-Profile-Token")
+        if token and self.config["token"] and hmac.compare_digest(token, self.config["token"]):
+            return True
+        return random.random() < self.config["sample_rate"]
+
+    def profile_view(self, view, args, kwargs):
+        record = self.local.record = {"sql": {}, "firebase": {}}
+        if self.config["mode"] == "cprofile":
+            profile = cProfile.Profile()
+            start = perf_counter()
+            try:
+                response = profile.runcall(view, *args, **kwargs)
+            finally:
+                duration = perf_counter() - start
+                self.local.record = None
+        else:
+            sampler = StackSampler(get_ident(), self.config["interval"], RequestProfiler.profile_view.__code__)
+            sampler.start()
+            start = perf_counter()
+            try:
+                response = view(*args, **kwargs)
+            finally:
+                duration = perf_counter() - start
+                stacks = sampler.stop()
+                self.local.record = None
+
+        response = current_app.make_response(response)
+        request_id = re.sub(r"[^\w-]", "_", request.headers.get("X-Request-Id") or uuid4().hex[:12])
+        record.update({
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "path": request.full_path,
+            "status": response.status_code,
+            "request_id": request_id,
+            "timestamp": time(),
+            "mode": self.config["mode"],
+            "duration_ms": round(duration * 1000, 3)
+        })
+
+        directory = path.join(self.config["directory"], re.sub(r"[^\w.-]", "_", request.endpoint or "unknown"))
+        makedirs(directory, exist_ok=True)
+        name = path.join(directory, f"{int(record['timestamp'] * 1000)}-{request_id}")
+        if self.config["mode"] == "cprofile":
+            profile.dump_stats(f"{name}.prof")
+            record["functions"] = get_functions(pstats.Stats(profile))
+        else:
+            record["folded"] = stacks
+        with open(f"{name}.json", "w") as file:
+            json.dump(record, file)
+        self.prune(directory)
+
+        response.headers["X-Profile-Id"] = path.relpath(f"{name}.json", self.config["directory"])
+        return response
+
+    def prune(self, directory):
+        names = sorted(name for name in listdir(directory) if name.endswith(".json"))
+        for name in names[:max(0, len(names) - self.config["keep"])]:
+            for extension in (".json", ".prof"):
+                try:
+                    remove(path.join(directory, name[:-5] + extension))
+                except FileNotFoundError:
+                    pass
+
+    def add_call(self, group, name, elapsed):
+        record = getattr(self.local, "record", None)
+        if record is not None:
+            calls = record[group].setdefault(name, {"count": 0, "total_ms": 0.0})
+            calls["count"] += 1
+            calls["total_ms"] = round(calls["total_ms"] + elapsed * 1000, 3)
+
+    def instrument_sql(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        @event.listens_for(Engine, "before_cursor_execute")
+        def start_statement(connection, cursor, statement, parameters, context, executemany):
+            if getattr(self.local, "record", None) is not None:
+                connection.info["profile_started_at"] = perf_counter()
+
+        @event.listens_for(Engine, "after_cursor_execute")
+        def end_statement(connection, cursor, statement, parameters, context, executemany):
+            started_at = connection.info.pop("profile_started_at", None)
+            if started_at is not None:
+                self.add_call("sql", " ".join(statement.split())[:300], perf_counter() - started_at)
+
+    def instrument_firebase(self):
+        from firebase_admin import auth
+
+        def timed(name, func):
+            @wraps(func)
+            def call(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add_call("firebase", name, perf_counter() - start)
+            return call
+
+        for name in FIREBASE_CALLS:
+            setattr(auth, name, timed(name, getattr(auth, name)))
+
+def get_functions(stats, limit=50):
+    functions = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        functions.append({"function": f"{name} ({path.basename(filename)}:{line})", "calls": calls,
+                          "self_ms": round(own * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)})
+    return sorted(functions, key=lambda function: function["self_ms"], reverse=True)[:limit]
+
+def load_profiles(directory, endpoint=None):
+    profiles = {}
+    for name in sorted(listdir(directory)) if path.isdir(directory) else []:
+        if endpoint and name != endpoint:
+            continue
+        for filename in sorted(listdir(path.join(directory, name))):
+            if filename.endswith(".json"):
+                with open(path.join(directory, name, filename)) as file:
+                    profiles.setdefault(name, []).append(json.load(file))
+    return profiles
+
+def aggregate(records):
+    durations = sorted(record["duration_ms"] for record in records)
+    sql = [sum(call["total_ms"] for call in record["sql"].values()) for record in records]
+    firebase = [sum(call["total_ms"] for call in record["firebase"].values()) for record in records]
+    hot = {}
+    for record in records:
+        for stack, samples in record.get("folded", {}).items():
+            frame = stack.rsplit(";", 1)[-1]
+            hot[frame] = hot.get(frame, 0) + samples
+        for function in record.get("functions", []):
+            hot[function["function"]] = hot.get(function["function"], 0) + function["self_ms"]
+    return {
+        "profiles": len(records),
+        "p50_ms": durations[len(durations) // 2],
+        "max_ms": durations[-1],
+        "sql_ms": sum(sql) / len(records),
+        "sql_statements": sum(sum(call["count"] for call in record["sql"].values()) for record in records) / len(records),
+        "firebase_ms": sum(firebase) / len(records),
+        "firebase_calls": sum(sum(call["count"] for call in record["firebase"].values()) for record in records) / len(records),
+        "hot": sorted(hot.items(), key=lambda item: item[1], reverse=True)
+    }
+
+profiling = AppGroup("profile", help="Aggregate and compare the request profiles written to PROFILE_DIR.")
+
+@profiling.command("summarize")
+@click.argument("directory", required=False)
+@click.option("--endpoint", help="Only the profiles of this endpoint, e.g. v1.forums.get_forums.")
+@click.option("--top", default=10, show_default=True, help="Hottest frames shown per endpoint.")
+def summarize(directory, endpoint, top):
+    """Show the duration, SQL and Firebase time and the hottest frames per endpoint."""
+    for name, records in load_profiles(directory or current_app.config.get("PROFILE_DIR"), endpoint).items():
+        summary = aggregate(records)
+        click.echo(f"{name}: {summary['profiles']} profiles, p50 {summary['p50_ms']:.1f} ms, max {summary['max_ms']:.1f} ms")
+        click.echo(f"  sql {summary['sql_ms']:.1f} ms in {summary['sql_statements']:.1f} statements, "
+                   f"firebase {summary['firebase_ms']:.1f} ms in {summary['firebase_calls']:.1f} calls (mean per request)")
+        for frame, weight in summary["hot"][:top]:
+            click.echo(f"  {weight:>10.1f}  {frame}")
+
+@profiling.command("compare")
+@click.argument("baseline")
+@click.argument("candidate")
+def compare(baseline, candidate):
+    """Compare the mean timings per endpoint of two profile directories."""
+    before, after = load_profiles(baseline), load_profiles(candidate)
+    for name in sorted(set(before) | set(after)):
+        old = aggregate(before[name]) if name in before else None
+        new = aggregate(after[name]) if name in after else None
+        value = lambda summary, column: f"{summary[column]:.1f}" if summary else "-"
+        cells = [f"{column} {value(old, column)} -> {value(new, column)}" for column in ("p50_ms", "sql_ms", "sql_statements", "firebase_ms")]
+        click.echo(f"{name}: " + ", ".join(cells))
+
+@profiling.command("folded")
+@click.argument("directory", required=False)
+@click.option("--endpoint", required=True, help="Endpoint whose sampled stacks are merged.")
+def folded(directory, endpoint):
+    """Print the merged folded stacks of an endpoint, for flamegraph.pl or speedscope."""
+    stacks = {}
+    for records in load_profiles(directory or current_app.config.get("PROFILE_DIR"), endpoint).values():
+        for record in records:
+            for stack, samples in record.get("folded", {}).items():
+                stacks[stack] = stacks.get(stack, 0) + samples
+    for stack, samples in sorted(stacks.items()):
+        click.echo(f"{stack} {samples}")
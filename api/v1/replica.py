@@ -0,0 +1,64 @@
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, text
+from time import monotonic
+
+_replica_lag = {"checked_at": None, "in_sync": True}
+
+class RoutingSession(Session):
+    """Sends the SELECTs of read-only requests to the "replica" bind and everything else to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or (clause is not None and not isinstance(clause, Select)):
+                # Reads that follow a write in the same request have to see it
+                g.wrote = True
+                g.use_replica = False
+            elif "replica" in self._db.engines and use_replica(self._db.engines["replica"]):
+                return self._db.engines["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def use_replica(engine):
+    if not g.get("use_replica"):
+        return False
+
+    if "replica_checked" not in g:
+        from .extensions import cache
+        g.replica_checked = True
+        user = getattr(request, "user", None)
+        if user and cache.get(f"writes:{user.get('uid')}") is not None:
+            g.use_replica = False
+        elif not replica_in_sync(engine):
+            g.use_replica = False
+    return g.use_replica
+
+def replica_in_sync(engine):
+    if engine.dialect.name != "postgresql":
+        return True
+
+    now = monotonic()
+    if _replica_lag["checked_at"] is None or now - _replica_lag["checked_at"] > current_app.config.get("REPLICA_LAG_CHECK_INTERVAL", 5):
+        _replica_lag["checked_at"] = now
+        try:
+            with engine.connect() as connection:
+                # The last replayed transaction gets older while the primary is idle, so it only tells the lag
+                # when the replica hasn't replayed everything it received
+                lag = connection.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )).scalar()
+            _replica_lag["in_sync"] = lag <= current_app.config.get("REPLICA_LAG_TOLERANCE", 5)
+        except Exception:
+            _replica_lag["in_sync"] = False
+    return _replica_lag["in_sync"]
+
+def route_reads_to_replica():
+    g.use_replica = request.method == "GET"
+
+def record_writes(response):
+    # Users who just wrote read from the primary until the replica has caught up with their write
+    user = getattr(request, "user", None)
+    if g.get("wrote") and user:
+        from .extensions import cache
+        cache.set(f"writes:{user.get('uid')}", 1, current_app.config.get("REPLICA_LAG_TOLERANCE", 5))
+    return response
@@ -1,8 +1,10 @@
 from datetime import date
-from firebase_admin import auth
-from flask import Blueprint, request
-from ..extensions import db
+from flask import Blueprint, current_app, request
+from ..extensions import db, cache
+from ..admission import admission_lane
 from ..decorator import authenticated_only
+from ..compression import cache_compressed
+from ..helper import count_facets, get_user_profiles, insert_link, normalize_search, stream_list
 from ..models.campaigns import *
 
 campaigns = Blueprint("campaigns", __name__)
@@ -58,73 +60,133 @@ def get_campaigns():
     if search:
         keyword_search = [Campaign.name.ilike(f'%{keyword}%') for keyword in search.split()]
 
-    if page is not None and page.isdecimal():
-        campaigns = db.session.query(Campaign) \
-            .filter(*keyword_search, *get_campaign_filters(status, location_id, category_id, user_id, is_registered)) \
-            .order_by(*orders) \
-            .paginate(page=int(page), per_page=5, error_out=False)
+    campaigns = db.session.query(Campaign) \
+        .filter(*keyword_search, *get_campaign_filters(status, location_id, category_id, user_id, is_registered)) \
+        .order_by(*orders)
+
+    if page is None or not page.isdecimal():
+        return stream_list(campaigns, lambda chunk: Campaign.serialize_list(user_id, chunk))
+
+    page = max(int(page), 1)
+    get_page = lambda: Campaign.extract_list(campaigns.paginate(page=page, per_page=5, error_out=False))
+    if is_registered:
+        campaigns_extracted = get_page()
     else:
-        campaigns = db.session.query(Campaign) \
-            .filter(*keyword_search, *get_campaign_filters(status, location_id, category_id, user_id, is_registered)) \
-            .order_by(*orders).all()
+        # The status of a campaign changes with the date
+        key = cache.key("campaigns", "list", date.today(), status, normalize_search(search), location_id, category_id, page)
+        campaigns_extracted = cache.get_or_set(key, get_page, current_app.config.get("LIST_CACHE_TTL", 300))
+    return {"data": Campaign.overlay_registrations(user_id, campaigns_extracted)}, 200
 
-    user_id = request.user.get("uid")
-    return {"data": Campaign.serialize_list(user_id, campaigns)}, 200
+@campaigns.route("/campaign-facets", methods=["GET"])
+@authenticated_only
+def get_campaign_facets():
+    _, status, location_id, category_id, is_registered, user_id, search = get_campaign_query(request)
+
+    def get_facets():
+        keyword_search = [Campaign.name.ilike(f'%{keyword}%') for keyword in (search or "").split()]
+        rows = db.session.query(CampaignCategory.id, CampaignCategory.name, CampaignLocation.id, CampaignLocation.name, db.func.count(Campaign.id)) \
+            .join(CampaignCategory, CampaignCategory.id == Campaign.category_id) \
+            .join(CampaignLocation, CampaignLocation.id == Campaign.location_id) \
+            .filter(*keyword_search, *get_campaign_filters(status, None, None, user_id, is_registered)) \
+            .group_by(CampaignCategory.id, CampaignCategory.name, CampaignLocation.id, CampaignLocation.name)
+        return count_facets(rows, category_id, location_id)
+
+    if is_registered:
+        return {"data": get_facets()}, 200
+
+    # The status of a campaign changes with the date
+    cache_compressed("campaigns")
+    key = cache.key("campaigns", "facets", date.today(), status, normalize_search(search), location_id, category_id)
+    return {"data": cache.get_or_set(key, get_facets, current_app.config.get("FACETS_CACHE_TTL", 300))}, 200
+
+def get_participants_query(id):
+    return db.session.query(CampaignParticipant, CampaignWinner.position) \
+        .outerjoin(CampaignWinner, db.and_(CampaignWinner.user_id == CampaignParticipant.user_id, CampaignWinner.campaign_id == CampaignParticipant.campaign_id)) \
+        .filter(CampaignParticipant.campaign_id == id) \
+        .order_by(CampaignWinner.position.asc().nulls_last(), CampaignParticipant.created_at.asc(), CampaignParticipant.user_id.asc())
 
 @campaigns.route("/campaigns/<int:id>", methods=["GET"])
 @authenticated_only
 def get_campaign(id):
-    campaign = db.session.get(Campaign, id)
-    if not campaign:
-        return {"message": f"Campaign with id {id} doesn't exist"}, 404
-    
     user_id = request.user.get("uid")
-    return {"data": campaign.serialize(user_id)}, 200
+    include = {item.strip() for item in (request.args.get("include") or "").split(",")} & {"details", "participants"}
+    if not include:
+        campaign = db.session.get(Campaign, id)
+        if not campaign:
+            return {"message": f"Campaign with id {id} doesn't exist"}, 404
+        return {"data": campaign.serialize(user_id)}, 200
+
+    # The campaign with its names and participant count, its details and the caller's registration come from one query
+    total_participants = db.session.query(db.func.count(CampaignParticipant.user_id)) \
+        .filter(CampaignParticipant.campaign_id == Campaign.id).correlate(Campaign).scalar_subquery()
+    row = db.session.query(Campaign, CampaignCategory.name, CampaignLocation.name, total_participants, CampaignDetails,
+                           CampaignParticipant.user_id, CampaignParticipant.submission_url) \
+        .outerjoin(CampaignCategory, CampaignCategory.id == Campaign.category_id) \
+        .outerjoin(CampaignLocation, CampaignLocation.id == Campaign.location_id) \
+        .outerjoin(CampaignDetails, CampaignDetails.campaign_id == Campaign.id) \
+        .outerjoin(CampaignParticipant, db.and_(CampaignParticipant.campaign_id == Campaign.id, CampaignParticipant.user_id == user_id)) \
+        .filter(Campaign.id == id).first()
+    if not row:
+        return {"message": f"Campaign with id {id} doesn't exist"}, 404
+
+    campaign, category_name, location_name, total_participants, campaign_detail, participant_id, submission_url = row
+    participants = get_participants_query(id).limit(10).all() if "participants" in include else []
+    user_ids = [participant.user_id for participant, _ in participants]
+    if "details" in include and campaign_detail:
+        user_ids.append(campaign_detail.initiator_id)
+    profiles = get_user_profiles(user_ids)
+
+    campaign_extracted = {"campaign": Campaign.extract(campaign, category_name, location_name, total_participants)}
+    campaign_extracted["is_registered"] = participant_id is not None
+    if "details" in include:
+        initiator = profiles.get(campaign_detail.initiator_id) if campaign_detail else None
+        campaign_extracted["details"] = {
+            "campaign_detail": {
+                "description": campaign_detail.description,
+                "terms": campaign_detail.terms,
+                "mission": campaign_detail.mission,
+                "initiator_name": initiator["display_name"] if initiator else None
+            } if campaign_detail else None,
+            "submission_url": submission_url
+        }
+    if "participants" in include:
+        campaign_extracted["participants"] = CampaignParticipant.serialize_list(participants, profiles)
+    return {"data": campaign_extracted}, 200
 
 @campaigns.route("/campaigns/<int:id>/registrations", methods=["POST"])
 @authenticated_only
 def register_campaign(id):
-    campaign = db.session.get(Campaign, id)
-    if not campaign:
-        return {"message": f"Campaign with id {id} doesn't exist"}, 404
-    
     user_id = request.user.get("uid")
-    campaign_participant = db.session.query(CampaignParticipant) \
-        .filter_by(user_id=user_id, campaign_id=campaign.id).first()
-    
-    if campaign_participant:
+    campaign_participant = insert_link(CampaignParticipant, CampaignParticipant.campaign_id, id, {"user_id": user_id})
+    if not campaign_participant:
+        if not db.session.get(Campaign, id):
+            return {"message": f"Campaign with id {id} doesn't exist"}, 404
         return {"message": f"User {user_id} is already registered"}, 409
     
-    campaign_participant = CampaignParticipant(user_id=user_id, campaign_id=campaign.id)
-    db.session.add(campaign_participant)
     db.session.commit()
+    cache.invalidate("campaigns")
 
-    return {"data": campaign_participant}, 201
+    return {"data": CampaignParticipant(**campaign_participant._mapping)}, 201
 
 @campaigns.route("/campaigns/<int:id>/submissions", methods=["POST"])
 @authenticated_only
 def submit_campaign_tasks(id):
-    campaign = db.session.get(Campaign, id)
-    if not campaign:
-        return {"message": f"Campaign with id {id} doesn't exist"}, 404
-    
     user_id = request.user.get("uid")
-    campaign_participant = db.session.query(CampaignParticipant) \
-        .filter_by(user_id=user_id, campaign_id=campaign.id).first()
-    
     submission_url = request.json.get("submission_url")
 
     if not submission_url:
+        if not db.session.get(Campaign, id):
+            return {"message": f"Campaign with id {id} doesn't exist"}, 404
         return {"message": "Submission url are required"}, 400
     
-    if campaign_participant:
-        campaign_participant.submission_url = submission_url
-    else:
-        campaign_participant = CampaignParticipant(user_id=user_id, campaign_id=campaign.id, submission_url=submission_url)
-        db.session.add(campaign_participant)
+    campaign_participant = insert_link(CampaignParticipant, CampaignParticipant.campaign_id, id,
+                                       {"user_id": user_id, "submission_url": submission_url}, update=("submission_url",))
+    if not campaign_participant:
+        return {"message": f"Campaign with id {id} doesn't exist"}, 404
     db.session.commit()
+    cache.invalidate("campaigns")
     
-    return {"data": campaign_participant}, 201
+    return {"data": CampaignParticipant(**campaign_participant._mapping)}, 201
 
 @campaigns.route("/campaigns/<int:id>/details", methods=["GET"])
 @authenticated_only
@@ -144,18 +206,18 @@ def get_campaign_participants(id):
     if not campaign:
         return {"message": f"Campaign with id {id} doesn't exist"}, 404
     
-    campaign_winners = db.session.query(CampaignWinner) \
-        .filter_by(campaign_id=id) \
-        .order_by(CampaignWinner.position.asc()).all()
-    campaign_winners_id = [winner.user_id for winner in campaign_winners]
-
-    campaign_participants = db.session.query(CampaignParticipant) \
-        .filter(CampaignParticipant.user_id.notin_(campaign_winners_id), CampaignParticipant.campaign_id==id) \
-        .order_by(CampaignParticipant.created_at.asc()).all()
-    
-    return {"data": [{"winners": campaign_winners}, {"other_participants": campaign_participants}]}, 200
+    page = request.args.get("page")
+    participants = get_participants_query(id)
+
+    if page is not None and page.isdecimal():
+        participants = participants.paginate(page=int(page), per_page=10, error_out=False).items
+    else:
+        participants = participants.all()
+
+    return {"data": CampaignParticipant.serialize_list(participants)}, 200
 
 @campaigns.route("/campaign-locations", methods=["GET"])
+@admission_lane("critical")
 @authenticated_only
 def get_campaign_locations():
     locations = db.session.query(CampaignLocation) \
@@ -163,6 +225,7 @@ def get_campaign_locations():
     return {"data": locations}, 200
 
 @campaigns.route("/campaign-categories", methods=["GET"])
+@admission_lane("critical")
 @authenticated_only
 def get_campaign_categories():
     categories = db.session.query(CampaignCategory) \
@@ -1,9 +1,10 @@
-from firebase_admin import auth
-from flask import Blueprint, request
-from os import getenv
-from ..extensions import db
+from flask import Blueprint, current_app, request
+from sqlalchemy import delete
+from ..extensions import db, cache, clients
+from ..admission import admission_lane
 from ..decorator import authenticated_only
-from ..helper import get_bucket_storage
+from ..helper import apply_link_operations, get_operations, insert_ignoring_duplicates, insert_link, is_id, stream_list, upload_image
+from ..jobs import sentiment_queue
 from ..models.campaigns import Campaign
 from ..models.forums import *
 
@@ -12,6 +13,7 @@ forums = Blueprint("forums", __name__)
 @forums.route("/users/<string:id>/forums")
 @authenticated_only
 def get_forums_by_author(id):
+    auth = clients.get("auth")
     try:
         auth.get_user(uid=id)
     except auth.UserNotFoundError:
@@ -19,34 +21,36 @@ def get_forums_by_author(id):
     
     page = request.args.get("page")
 
-    if page is not None and page.isdecimal():
-        forums = db.session.query(Forum) \
-            .filter_by(author_id=id) \
-            .order_by(Forum.created_at.desc()) \
-            .paginate(page=int(page), per_page=5, error_out=False)
-    else:
-        forums = db.session.query(Forum) \
-            .filter_by(author_id=id) \
-            .order_by(Forum.created_at.desc()).all()
-    
+    forums = db.session.query(Forum) \
+        .filter_by(author_id=id) \
+        .order_by(Forum.created_at.desc())
+
+    if page is None or not page.isdecimal():
+        return stream_list(forums, lambda chunk: Forum.serialize_list(id, chunk))
+
+    forums = forums.paginate(page=int(page), per_page=5, error_out=False)
     return {"data": Forum.serialize_list(id, forums)}, 200
 
 @forums.route("/forums")
 @authenticated_only
 def get_forums():
     page = request.args.get("page")
+    user_id = request.user.get("uid")
+    forums = db.session.query(Forum).order_by(Forum.created_at.desc(), Forum.id.desc())
 
     if page is not None and page.isdecimal():
-        forums = db.session.query(Forum) \
-            .order_by(Forum.created_at.desc()) \
-            .paginate(page=int(page), per_page=5, error_out=False)
-    else:
-        forums = db.session.query(Forum).order_by(Forum.created_at.desc()).all()
-    
-    user_id = request.user.get("uid")
-    return {"data": Forum.serialize_list(user_id, forums)}, 200
+        page = max(int(page), 1)
+        get_page = lambda: Forum.extract_list(forums.paginate(page=page, per_page=5, error_out=False))
+        if page <= current_app.config.get("FEED_CACHED_PAGES", 3):
+            forums_extracted = cache.get_or_set(cache.key("forums", "feed", page), get_page, current_app.config.get("FEED_CACHE_TTL", 60))
+        else:
+            forums_extracted = get_page()
+        return {"data": Forum.overlay_likes(user_id, forums_extracted)}, 200
+
+    return stream_list(forums, lambda chunk: Forum.serialize_list(user_id, chunk))
 
 @forums.route("/forums", methods = ['POST'])
+@admission_lane("external")
 @authenticated_only
 def create_forum():
     data = request.form if request.content_type.startswith("multipart/form-data") else request.json
@@ -65,12 +69,7 @@ def create_forum():
         if not image.content_type.startswith("image/"):
             return {"message": "File is not a valid image"}, 400
         
-        bucket = get_bucket_storage(getenv("BUCKET_NAME"))
-        blob = bucket.blob(f"forums/{image.filename}")
-        
-        blob.upload_from_file(image)
-        blob.make_public()
-        image_url = blob.public_url
+        image_url = upload_image(image, "forums")
 
     forum = Forum(title=title, text=text, image_url=image_url ,author_id=request.user.get('user_id'))
     db.session.add(forum)
@@ -85,6 +84,8 @@ def create_forum():
             db.session.add(forum_campaign)
             db.session.commit()
 
+    cache.invalidate("forums")
+    sentiment_queue.enqueue("forum", [forum.id])
     user_id = request.user.get("uid")
     return {"data": forum.serialize(user_id)}, 200
 
@@ -110,24 +111,22 @@ def delete_forum(id):
     
     db.session.delete(forum)
     db.session.commit()
+    cache.invalidate("forums")
     return {"message": f"Forum with id {id} deleted"}, 200
 
 @forums.route('/forums/<int:id>/likes', methods=["POST"])
 @authenticated_only
 def add_forum_likes(id):
-    forum = db.session.get(Forum, id)
-    if not forum:
-        return {"message": f"Forum with id {id} doesn't exist"}, 404
-    
     user_id = request.user.get("uid")
-    forum_likes = db.session.get(ForumLike, (forum.id, user_id))
-    if forum_likes:
+    forum_likes = insert_link(ForumLike, ForumLike.forum_id, id, {"user_id": user_id})
+    if not forum_likes:
+        if not db.session.get(Forum, id):
+            return {"message": f"Forum with id {id} doesn't exist"}, 404
         return {"message": f"Forum {id} is already liked"}, 409
     
-    forum_likes = ForumLike(forum_id=forum.id, user_id=user_id)
-    db.session.add(forum_likes)
     db.session.commit()
-    return {"data": forum}, 200
+    cache.invalidate("forums")
+    return {"data": Forum.extract_one(id)}, 200
     
 
 @forums.route('/forums/<int:id>/likes', methods=["DELETE"])
@@ -144,8 +143,36 @@ def delete_forum_likes(id):
     
     db.session.delete(forum_likes)
     db.session.commit()
+    cache.invalidate("forums")
     return {"data": forum}, 200
 
+@forums.route('/forums/likes', methods=["POST"])
+@authenticated_only
+def batch_forum_likes():
+    operations = get_operations(request)
+    if not operations:
+        return {"message": "Operations are required"}, 400
+
+    user_id = request.user.get("uid")
+    ids = {operation.get("forum_id") for operation in operations if is_id(operation.get("forum_id"))}
+    forum_ids = {forum_id for forum_id, in db.session.query(Forum.id).filter(Forum.id.in_(ids))}
+    liked_ids = {forum_id for forum_id, in db.session.query(ForumLike.forum_id) \
+        .filter(ForumLike.user_id == user_id, ForumLike.forum_id.in_(forum_ids))}
+
+    results, added_ids, removed_ids = apply_link_operations(operations, "forum_id", int, forum_ids, liked_ids, {
+        "not_found": "Forum with id {id} doesn't exist",
+        "already_linked": "Forum {id} is already liked",
+        "not_linked": "Forum {id} is not liked yet"
+    })
+
+    if added_ids:
+        db.session.execute(insert_ignoring_duplicates(ForumLike), [{"forum_id": forum_id, "user_id": user_id} for forum_id in added_ids])
+    if removed_ids:
+        db.session.execute(delete(ForumLike).where(ForumLike.user_id == user_id, ForumLike.forum_id.in_(removed_ids)))
+    db.session.commit()
+    cache.invalidate("forums")
+    return {"data": results}, 200
+
 @forums.route('/forums/<int:id>/comments', methods=["POST"])
 @authenticated_only
 def create_forum_comments(id):
@@ -160,6 +187,8 @@ def create_forum_comments(id):
     comments = Comment(text=text, author_id=request.user.get('user_id'), forum_id=forum.id)
     db.session.add(comments)
     db.session.commit()
+    cache.invalidate("forums")
+    sentiment_queue.enqueue("comment", [comments.id])
     return {"data": comments}, 200
 
 @forums.route('/forums/<int:id>/comments', methods=["GET"])
@@ -168,17 +197,14 @@ def get_forum_comments(id):
     page = request.args.get("page")
     forum = db.session.get(Forum, id)
 
-    if page is not None and page.isdecimal():
-        comments = db.session.query(Comment) \
-            .filter_by(forum_id=forum.id) \
-            .order_by(Comment.created_at.desc()) \
-            .paginate(page=int(page), per_page=10, error_out=False).items
+    comments = db.session.query(Comment) \
+        .filter_by(forum_id=forum.id) \
+        .order_by(Comment.created_at.desc())
 
-    else:
-        comments = db.session.query(Comment) \
-            .filter_by(forum_id=forum.id) \
-            .order_by(Comment.created_at.desc()).all()
+    if page is None or not page.isdecimal():
+        return stream_list(comments)
 
+    comments = comments.paginate(page=int(page), per_page=10, error_out=False).items
     return {"data": comments}, 200
 
 @forums.route('/forums/<int:id>/comments/<int:comment_id>', methods=["DELETE"])
@@ -197,4 +223,5 @@ def delete_forum_comment(id, comment_id):
     
     db.session.delete(comment)
     db.session.commit()
+    cache.invalidate("forums")
     return {"message": f"Comment with id {comment_id} deleted"}, 200
\ No newline at end of file
@@ -0,0 +1,12 @@
+from flask import Blueprint
+from ..admission import admission_lane
+from ..decorator import token_only
+from ..extensions import admission, cache
+
+metrics = Blueprint("metrics", __name__)
+
+@metrics.route("/metrics", methods=["GET"])
+@admission_lane("critical")
+@token_only("METRICS_TOKEN", "X-Metrics-Token")
+def get_metrics():
+    return {"data": {"admission": admission.stats(), "cache": cache.stats()}}, 200
\ No newline at end of file
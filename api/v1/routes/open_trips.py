@@ -1,23 +1,60 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from flask import Blueprint, request
+from sqlalchemy import delete, insert
 from ..extensions import db
 from ..decorator import authenticated_only
+from ..helper import get_operations, is_id, parse_price, stream_list
 from ..models.open_trips import *
 
 open_trip = Blueprint("open_trip", __name__)
 
+TRIP_SORTS = {
+    "regis_deadline": OpenTrip.regis_deadline,
+    "price": OpenTrip.price,
+    "trip_start": OpenTrip.trip_start,
+    "trip_end": OpenTrip.trip_end
+}
+
+def get_trip_filters(args):
+    filters = []
+    if args.get("min_price"):
+        filters.append(OpenTrip.price >= parse_price(args.get("min_price")))
+    if args.get("max_price"):
+        filters.append(OpenTrip.price <= parse_price(args.get("max_price")))
+
+    if args.get("start_after"):
+        filters.append(OpenTrip.trip_start >= datetime.strptime(args.get("start_after"), "%Y-%m-%d"))
+    if args.get("end_before"):
+        filters.append(OpenTrip.trip_end < datetime.strptime(args.get("end_before"), "%Y-%m-%d") + timedelta(days=1))
+    if args.get("open_only") == "true":
+        filters.append(OpenTrip.regis_deadline >= datetime.combine(date.today(), datetime.min.time()))
+
+    if args.get("category"):
+        categories = [category.strip() for category in args.get("category").split(",") if category.strip()]
+        filters.append(OpenTrip.id.in_(db.session.query(TripDestination.trip_id).filter(TripDestination.category.in_(categories))))
+    return filters
+
 @open_trip.route('/open-trips')
 @authenticated_only
 def get_trips():
     page = request.args.get("page")
+    sort = request.args.get("sort", "-regis_deadline")
+    if sort.lstrip("-") not in TRIP_SORTS:
+        return {"message": f"Sort must be one of {', '.join(TRIP_SORTS)}, prefixed with - for descending order"}, 400
 
-    if page is not None and page.isdecimal():
-        trips = db.session.query(OpenTrip) \
-            .order_by(OpenTrip.regis_deadline.desc()) \
-            .paginate(page=int(page), per_page=10, error_out=False).items
-    else:
-        trips = db.session.query(OpenTrip).order_by(OpenTrip.regis_deadline.desc()).all()
-    
+    try:
+        filters = get_trip_filters(request.args)
+    except ValueError:
+        return {"message": "Prices must be numbers and dates must be formatted as YYYY-MM-DD"}, 400
+
+    column = TRIP_SORTS[sort.lstrip("-")]
+    order = column.desc() if sort.startswith("-") else column.asc()
+    trips = db.session.query(OpenTrip).filter(*filters).order_by(order, OpenTrip.id.desc() if sort.startswith("-") else OpenTrip.id.asc())
+
+    if page is None or not page.isdecimal():
+        return stream_list(trips)
+
+    trips = trips.paginate(page=int(page), per_page=10, error_out=False).items
     return {"data": trips}, 200
 
 @open_trip.route('/open-trips', methods = ['POST'])
@@ -35,6 +72,11 @@ def create_trip():
     if not title or not description or not price or not organizer or not start_str or not end_str or not deadline_str or not phone_number:
         return {"message": "Please input all required data"}, 400
     
+    try:
+        price = parse_price(price)
+    except ValueError:
+        return {"message": "Price must be a single amount, like Rp 1.500.000"}, 400
+
     trip_start = datetime.strptime(start_str, "%Y-%m-%d")
     trip_end = datetime.strptime(end_str, "%Y-%m-%d")
     regis_deadline = datetime.strptime(deadline_str, "%Y-%m-%d")
@@ -97,6 +139,56 @@ def post_destination(id):
     
     return {"data": destination}, 200
 
+@open_trip.route('/open-trips/destinations', methods=["POST"])
+@authenticated_only
+def batch_destinations():
+    operations = get_operations(request)
+    if not operations:
+        return {"message": "Operations are required"}, 400
+
+    trip_ids = {operation.get("trip_id") for operation in operations if is_id(operation.get("trip_id"))}
+    trip_ids = {trip_id for trip_id, in db.session.query(OpenTrip.id).filter(OpenTrip.id.in_(trip_ids))}
+    destination_ids = {operation.get("destination_id") for operation in operations if is_id(operation.get("destination_id"))}
+    destination_trips = dict(db.session.query(TripDestination.id, TripDestination.trip_id).filter(TripDestination.id.in_(destination_ids)))
+
+    results, created, deleted_ids = [], [], set()
+    for operation in operations:
+        trip_id, method = operation.get("trip_id"), operation.get("method")
+        destination_id = operation.get("destination_id")
+        if method not in ("POST", "DELETE") or not is_id(trip_id):
+            results.append({"trip_id": trip_id, "status": 400, "message": "trip_id and method POST or DELETE are required"})
+        elif trip_id not in trip_ids:
+            results.append({"trip_id": trip_id, "status": 404, "message": f"Open trip with id {trip_id} doesn't exist"})
+        elif method == "POST":
+            if not operation.get("name") or not operation.get("location_name"):
+                results.append({"trip_id": trip_id, "status": 400, "message": "Name and location are required"})
+                continue
+            destination = {
+                "name": operation.get("name"),
+                "location_name": operation.get("location_name"),
+                "image_url": operation.get("image_url"),
+                "category": operation.get("category"),
+                "trip_id": trip_id
+            }
+            created.append(destination)
+            results.append({"trip_id": trip_id, "status": 200, "data": destination})
+        elif not is_id(destination_id):
+            results.append({"trip_id": trip_id, "status": 400, "message": "destination_id is required to delete a destination"})
+        elif destination_trips.get(destination_id) != trip_id or destination_id in deleted_ids:
+            results.append({"trip_id": trip_id, "status": 404, "message": f"Destination with id {destination_id} doesn't exist"})
+        else:
+            deleted_ids.add(destination_id)
+            results.append({"trip_id": trip_id, "status": 200, "message": f"Destination with id {destination_id} deleted"})
+
+    if created:
+        created_ids = db.session.scalars(insert(TripDestination).returning(TripDestination.id, sort_by_parameter_order=True), created)
+        for destination, id in zip(created, created_ids):
+            destination["id"] = id
+    if deleted_ids:
+        db.session.execute(delete(TripDestination).where(TripDestination.id.in_(deleted_ids)))
+    db.session.commit()
+    return {"data": results}, 200
+
 @open_trip.route('/open-trips/<int:id>/destinations/<int:destination_id>', methods=["DELETE"])
 @authenticated_only
 def delete_destination(id, destination_id):
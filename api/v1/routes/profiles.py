@@ -1,25 +1,28 @@
 from flask import Blueprint, request
-from firebase_admin import auth
-from os import getenv
-from ..helper import get_bucket_storage
+from ..extensions import cache, clients
+from ..helper import get_user_profiles, upload_image
+from ..admission import admission_lane
 from ..decorator import authenticated_only
 
 profiles = Blueprint("profiles", __name__)
 
 @profiles.route("/profile-pictures", methods=["PUT"])
+@admission_lane("external")
 @authenticated_only
 def update_profile_picture():
-    bucket = get_bucket_storage(getenv("BUCKET_NAME"))
     user_id = request.user.get("uid")
 
     file = request.files.get("photo")
     if not (file and file.content_type.startswith("image/")):
         return {"message": "File is not a valid image"}, 400
     
-    blob = bucket.blob(f"profiles/photo-{user_id}.{file.content_type[6:]}")
-    blob.upload_from_file(file)
-    blob.make_public()
+    photo_url = upload_image(file, "profiles")
+    profile = get_user_profiles([user_id]).get(user_id)
+    if profile and profile.get("photo_url") == photo_url:
+        return {"data": photo_url}, 200
 
-    user = auth.update_user(uid=user_id, photo_url=blob.public_url)
+    user = clients.get("auth").update_user(uid=user_id, photo_url=photo_url)
+    cache.delete(f"profiles:{user_id}")
+    cache.invalidate("forums")
 
     return {"data": user.photo_url}, 200
\ No newline at end of file
@@ -1,17 +1,19 @@
-import requests
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 from os import getenv
+from ..extensions import clients
+from ..admission import admission_lane
 from ..decorator import authenticated_only
 
 sentiments = Blueprint("sentiments", __name__)
 
 @sentiments.route("/analyze_sentiment", methods=["GET"])
+@admission_lane("external")
 @authenticated_only
 def get_sentiment():
     words = request.args.get("words")
     url = getenv("SENTIMENTS_SERVICE")
 
-    response = requests.get(f"{url}/analyze_sentiment?words={words}")
+    response = clients.get("http").get(f"{url}/analyze_sentiment?words={words}", timeout=current_app.config.get("OUTBOUND_TIMEOUT", 10))
     if response.status_code == 404:
         return response.json(), 404
     
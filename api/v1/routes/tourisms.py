@@ -1,8 +1,11 @@
-import requests
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 from os import getenv
-from ..extensions import db
+from sqlalchemy import delete
+from ..extensions import db, cache, clients
+from ..admission import admission_lane
 from ..decorator import authenticated_only
+from ..compression import cache_compressed
+from ..helper import apply_link_operations, count_facets, get_operations, insert_ignoring_duplicates, insert_link, is_id, normalize_search, stream_list
 from ..models.tourisms import *
 
 tourisms = Blueprint("tourisms", __name__)
@@ -50,17 +53,42 @@ def get_tourisms():
     if search:
         keyword_search = [Tourism.name.ilike(f'%{keyword}%') for keyword in search.split()]
 
-    if page is not None and page.isdecimal():
-        tourisms = db.session.query(Tourism) \
-            .filter(*keyword_search, *get_tourism_filters(location_id, category_id, is_favorite, user_id)) \
-            .order_by(Tourism.name.asc()) \
-            .paginate(page=int(page), per_page=5, error_out=False)
+    tourisms = db.session.query(Tourism) \
+        .filter(*keyword_search, *get_tourism_filters(location_id, category_id, is_favorite, user_id)) \
+        .order_by(Tourism.name.asc())
+
+    if page is None or not page.isdecimal():
+        return stream_list(tourisms, lambda chunk: Tourism.serialize_list(user_id, chunk))
+
+    page = max(int(page), 1)
+    get_page = lambda: Tourism.extract_list(tourisms.paginate(page=page, per_page=5, error_out=False))
+    if is_favorite:
+        tourisms_extracted = get_page()
     else:
-        tourisms = db.session.query(Tourism) \
-            .filter(*keyword_search, *get_tourism_filters(location_id, category_id, is_favorite, user_id)) \
-            .order_by(Tourism.name.asc()).all()
+        key = cache.key("tourisms", "list", normalize_search(search), location_id, category_id, page)
+        tourisms_extracted = cache.get_or_set(key, get_page, current_app.config.get("LIST_CACHE_TTL", 300))
+    return {"data": Tourism.overlay_favorites(user_id, tourisms_extracted)}, 200
+
+@tourisms.route("/tourism-facets", methods=["GET"])
+@authenticated_only
+def get_tourism_facets():
+    _, location_id, category_id, is_favorite, user_id, search = get_tourism_query(request)
+
+    def get_facets():
+        keyword_search = [Tourism.name.ilike(f'%{keyword}%') for keyword in (search or "").split()]
+        rows = db.session.query(TourismCategory.id, TourismCategory.name, TourismLocation.id, TourismLocation.name, db.func.count(Tourism.id)) \
+            .join(TourismCategory, TourismCategory.id == Tourism.category_id) \
+            .join(TourismLocation, TourismLocation.id == Tourism.location_id) \
+            .filter(*keyword_search, *get_tourism_filters(None, None, is_favorite, user_id)) \
+            .group_by(TourismCategory.id, TourismCategory.name, TourismLocation.id, TourismLocation.name)
+        return count_facets(rows, category_id, location_id)
 
-    return {"data": Tourism.serialize_list(user_id, tourisms)}, 200
+    if is_favorite:
+        return {"data": get_facets()}, 200
+
+    cache_compressed("tourisms")
+    key = cache.key("tourisms", "facets", normalize_search(search), location_id, category_id)
+    return {"data": cache.get_or_set(key, get_facets, current_app.config.get("FACETS_CACHE_TTL", 300))}, 200
 
 @tourisms.route("/tourisms/<string:id>", methods=["GET"])
 @authenticated_only
@@ -75,20 +103,16 @@ def get_tourism(id):
 @tourisms.route("/tourisms/<string:id>/favorites", methods=["POST"])
 @authenticated_only
 def create_tourism_favorite(id):
-    tourism = db.session.get(Tourism, id)
-    if not tourism:
-        return {"message": f"Tourism with id {id} doesn't exist"}, 404
-    
     user_id = request.user.get("uid")
-    tourism_favorites = db.session.get(TourismFavorite, (tourism.id, user_id))
-    if tourism_favorites:
+    tourism_favorites = insert_link(TourismFavorite, TourismFavorite.tourism_id, id, {"user_id": user_id})
+    if not tourism_favorites:
+        if not db.session.get(Tourism, id):
+            return {"message": f"Tourism with id {id} doesn't exist"}, 404
         return {"message": f"Tourism {id} is already in favorites"}, 409
     
-    tourism_favorites = TourismFavorite(tourism_id=tourism.id, user_id=user_id)
-    db.session.add(tourism_favorites)
     db.session.commit()
 
-    return {"data": tourism.serialize(user_id)}, 200
+    return {"data": {"tourism": Tourism.extract_one(id), "is_favorite": True}}, 200
 
 @tourisms.route("/tourisms/<string:id>/favorites", methods=["DELETE"])
 @authenticated_only
@@ -107,6 +131,32 @@ def delete_tourism_favorite(id):
 
     return {"data": tourism.serialize(user_id)}, 200
 
+@tourisms.route("/tourisms/favorites", methods=["POST"])
+@authenticated_only
+def batch_tourism_favorites():
+    operations = get_operations(request)
+    if not operations:
+        return {"message": "Operations are required"}, 400
+
+    user_id = request.user.get("uid")
+    ids = {operation.get("tourism_id") for operation in operations if is_id(operation.get("tourism_id"), str)}
+    tourism_ids = {tourism_id for tourism_id, in db.session.query(Tourism.id).filter(Tourism.id.in_(ids))}
+    favorite_ids = {tourism_id for tourism_id, in db.session.query(TourismFavorite.tourism_id) \
+        .filter(TourismFavorite.user_id == user_id, TourismFavorite.tourism_id.in_(tourism_ids))}
+
+    results, added_ids, removed_ids = apply_link_operations(operations, "tourism_id", str, tourism_ids, favorite_ids, {
+        "not_found": "Tourism with id {id} doesn't exist",
+        "already_linked": "Tourism {id} is already in favorites",
+        "not_linked": "Tourism {id} isn't a favorite yet"
+    })
+
+    if added_ids:
+        db.session.execute(insert_ignoring_duplicates(TourismFavorite), [{"tourism_id": tourism_id, "user_id": user_id} for tourism_id in added_ids])
+    if removed_ids:
+        db.session.execute(delete(TourismFavorite).where(TourismFavorite.user_id == user_id, TourismFavorite.tourism_id.in_(removed_ids)))
+    db.session.commit()
+    return {"data": results}, 200
+
 @tourisms.route("/tourisms/<string:id>/details", methods=["GET"])
 @authenticated_only
 def get_tourism_details(id):
@@ -127,6 +177,7 @@ def get_tourism_details(id):
     return {"data": tourism_details}, 200
 
 @tourisms.route("/tourism-categories", methods=["GET"])
+@admission_lane("critical")
 @authenticated_only
 def get_tourism_categories():
     categories = db.session.query(TourismCategory) \
@@ -134,6 +185,7 @@ def get_tourism_categories():
     return {"data": categories}, 200
 
 @tourisms.route("/tourism-locations", methods=["GET"])
+@admission_lane("critical")
 @authenticated_only
 def get_tourism_locations():
     locations = db.session.query(TourismLocation) \
@@ -141,12 +193,13 @@ def get_tourism_locations():
     return {"data": locations}, 200
 
 @tourisms.route("/tourism-recommendations", methods=["GET"])
+@admission_lane("external")
 @authenticated_only
 def get_tourism_recomendations():
     user_id = request.user.get("uid")
     url = getenv("RECOMMENDATIONS_SERVICE")
 
-    response = requests.post(f"{url}/predict", json={"user_id": user_id})
+    response = clients.get("http").post(f"{url}/predict", json={"user_id": user_id}, timeout=current_app.config.get("OUTBOUND_TIMEOUT", 10))
     if response.status_code == 200:
         tourisms = list()
         for item in response.json().get("data"):
@@ -0,0 +1,37 @@
+from os import environ, getenv, sched_getaffinity
+
+def get_available_cpus():
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(sched_getaffinity(0))
+
+bind = f":{getenv('PORT', 8080)}"
+worker_class = "gthread"
+workers = int(getenv("WEB_CONCURRENCY", get_available_cpus()))
+threads = int(getenv("THREADS", 8))
+timeout = int(getenv("TIMEOUT", 0))
+preload_app = getenv("PRELOAD_APP", "true").lower() in ("1", "true")
+
+# main.py sizes the database pool from THREADS, so every worker thread can hold a connection
+environ.setdefault("THREADS", str(threads))
+
+# The local cache lives in one process, so the invalidations of a worker would never reach the others
+environ.setdefault("CACHE_BACKEND", "shared" if workers > 1 else "local")
+if workers > 1 and environ["CACHE_BACKEND"] == "local":
+    raise RuntimeError(f"CACHE_BACKEND=local can't be shared by {workers} workers, use shared or redis")
+
+def post_fork(server, worker):
+    from main import app
+    from api.v1.extensions import db, clients
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    clients.reset()
+    clients.warm_up(getenv("WARMUP_CLIENTS"))
\ No newline at end of file
@@ -0,0 +1,83 @@
+import click
+import json
+import subprocess
+from datetime import datetime
+from os import makedirs, path
+from .traffic import HttpTarget, InProcessTarget, parse_mix, report, run as replay
+
+RESULTS = path.join(path.dirname(__file__), "results")
+COLUMNS = ("requests", "throughput", "error_rate", "p50_ms", "p95_ms", "p99_ms")
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(rows):
+    click.echo(f"{'scenario':<18}" + "".join(f"{column:>14}" for column in COLUMNS))
+    for name, result in rows:
+        click.echo(f"{name:<18}" + "".join(f"{str(result[column]):>14}" for column in COLUMNS))
+
+@click.group(help="Replay a weighted mix of the app's traffic and compare the runs.")
+def cli():
+    pass
+
+@cli.command()
+@click.option("--url", help="Base URL of a running server, e.g. one started with 'gunicorn loadtest.server:app'. The app is called in-process when omitted.")
+@click.option("--concurrency", default=8, show_default=True, help="Simulated users, or with --rate the most requests in flight.")
+@click.option("--rate", type=float, help="Requests per second arriving as a Poisson process (open loop) instead of users waiting for their responses.")
+@click.option("--duration", default=30.0, show_default=True, help="Seconds to replay the traffic.")
+@click.option("--mix", help="Scenario weights overriding the defaults, e.g. 'feed=50,like=0'.")
+@click.option("--seed", type=int, help="Seed of the traffic, to replay the same requests across runs.")
+@click.option("--label", help="Name of the run, saved along with the results.")
+@click.option("--output", default=RESULTS, show_default=True, help="Directory the run is saved to.")
+def run(url, concurrency, rate, duration, mix, seed, label, output):
+    """Replay the traffic and save the results as JSON."""
+    weights = parse_mix(mix)
+    if url:
+        target = HttpTarget(url)
+    else:
+        from .offline import create_app
+        target = InProcessTarget(create_app())
+
+    started_at = datetime.now()
+    samples, elapsed = replay(target, weights, concurrency, rate, duration, seed)
+    results = report(samples, elapsed)
+    print_table([("total", results["total"]), *results["scenarios"].items()])
+
+    makedirs(output, exist_ok=True)
+    commit = get_commit()
+    filename = path.join(output, f"{started_at:%Y%m%d-%H%M%S}-{label or commit or 'run'}.json")
+    with open(filename, "w") as file:
+        json.dump({
+            "label": label,
+            "commit": commit,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "config": {"url": url, "concurrency": concurrency, "rate": rate, "duration": duration, "mix": weights, "seed": seed},
+            "results": results
+        }, file, indent=2)
+    click.echo(f"Saved {filename}")
+
+@cli.command()
+@click.argument("baseline", type=click.File())
+@click.argument("candidate", type=click.File())
+def compare(baseline, candidate):
+    """Show how CANDIDATE changed from BASELINE, per scenario."""
+    baseline, candidate = json.load(baseline), json.load(candidate)
+    click.echo(f"{baseline.get('label') or baseline.get('commit')} -> {candidate.get('label') or candidate.get('commit')}")
+    click.echo(f"{'scenario':<18}" + "".join(f"{column:>24}" for column in COLUMNS[1:]))
+
+    names = ["total", *sorted(set(baseline["results"]["scenarios"]) | set(candidate["results"]["scenarios"]))]
+    for name in names:
+        before = baseline["results"]["total"] if name == "total" else baseline["results"]["scenarios"].get(name)
+        after = candidate["results"]["total"] if name == "total" else candidate["results"]["scenarios"].get(name)
+        cells = []
+        for column in COLUMNS[1:]:
+            old, new = (before or {}).get(column), (after or {}).get(column)
+            change = f" ({(new - old) / old:+.0%})" if old and new is not None else ""
+            cells.append(f"{old} -> {new}{change}")
+        click.echo(f"{name:<18}" + "".join(f"{cell:>24}" for cell in cells))
+
+if __name__ == "__main__":
+    cli()
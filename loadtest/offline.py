@@ -0,0 +1,149 @@
+import random
+import tempfile
+from datetime import date, datetime, timedelta
+from os import environ, getenv, path
+from time import sleep
+from types import SimpleNamespace
+
+DATABASE = getenv("LOADTEST_DATABASE", path.join(tempfile.gettempdir(), "traversee-loadtest.db"))
+SERVICE_LATENCY = float(getenv("LOADTEST_SERVICE_LATENCY", 0.05))
+USERS = int(getenv("LOADTEST_USERS", 200))
+TOURISMS = int(getenv("LOADTEST_TOURISMS", 500))
+CAMPAIGNS = int(getenv("LOADTEST_CAMPAIGNS", 50))
+FORUMS = int(getenv("LOADTEST_FORUMS", 2000))
+WORDS = ["pantai", "gunung", "danau", "pura", "air terjun", "bukit", "candi", "goa", "pulau", "taman"]
+
+def user_id(n):
+    return f"loadtest-user-{n}"
+
+def tourism_id(n):
+    return f"T{n:05d}"
+
+def fake_user(uid):
+    return SimpleNamespace(uid=uid, display_name=f"User {uid.rsplit('-', 1)[-1]}", photo_url=f"https://storage.googleapis.com/loadtest/profiles/{uid}.jpeg")
+
+def verify_id_token(token, *args, **kwargs):
+    if not token.startswith("loadtest-user-"):
+        raise ValueError("Not a load test token")
+    return {"uid": token, "user_id": token}
+
+def get_user(uid, *args, **kwargs):
+    from firebase_admin import auth
+    if not uid.startswith("loadtest-user-"):
+        raise auth.UserNotFoundError(f"No user record found for the provided user ID: {uid}.")
+    return fake_user(uid)
+
+def get_users(identifiers, *args, **kwargs):
+    uids = [identifier.uid for identifier in identifiers]
+    return SimpleNamespace(users=[fake_user(uid) for uid in uids if uid.startswith("loadtest-user-")],
+                           not_found=[uid for uid in uids if not uid.startswith("loadtest-user-")])
+
+def update_user(uid, photo_url=None, **kwargs):
+    return SimpleNamespace(uid=uid, photo_url=photo_url)
+
+class Response:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+class Services:
+    """Stands in for the recommendation and sentiment services, answering after SERVICE_LATENCY seconds."""
+
+    def post(self, url, json=None, timeout=None, **kwargs):
+        sleep(SERVICE_LATENCY)
+        ids = random.sample(range(1, TOURISMS + 1), min(10, TOURISMS))
+        return Response(200, {"data": [{tourism_id(n): 1.0} for n in ids]})
+
+    def get(self, url, timeout=None, **kwargs):
+        sleep(SERVICE_LATENCY)
+        return Response(200, {"data": {"sentiment": random.choice(["positive", "neutral", "negative"])}})
+
+class Blob:
+    def __init__(self, name):
+        self.name = name
+        self.cache_control = None
+
+    @property
+    def public_url(self):
+        return f"https://storage.googleapis.com/loadtest/{self.name}"
+
+    def exists(self):
+        return False
+
+    def upload_from_file(self, file, **kwargs):
+        file.read()
+
+class Storage:
+    def bucket(self, name):
+        return SimpleNamespace(blob=Blob)
+
+def install_stubs():
+    from firebase_admin import auth
+    from api.v1.extensions import clients
+
+    auth.verify_id_token = verify_id_token
+    auth.get_user = get_user
+    auth.get_users = get_users
+    auth.update_user = update_user
+    clients.register("firebase", object)
+    clients.register("storage", Storage)
+    clients.register("http", Services)
+
+def seed(db):
+    from sqlalchemy import insert, text
+    from api.v1.models.campaigns import Campaign, CampaignCategory, CampaignDetails, CampaignLocation, CampaignParticipant
+    from api.v1.models.forums import Comment, Forum, ForumLike
+    from api.v1.models.open_trips import OpenTrip, TripDestination
+    from api.v1.models.tourisms import Tourism, TourismCategory, TourismDetail, TourismLocation
+
+    db.create_all()
+    if db.session.query(Tourism.id).first():
+        return
+    db.session.execute(text("PRAGMA journal_mode=WAL"))
+
+    rng = random.Random(0)
+    today = date.today()
+    rows = [
+        (TourismLocation, [{"id": n, "name": f"Location {n}"} for n in range(1, 11)]),
+        (TourismCategory, [{"id": n, "name": f"Category {n}", "image_url": f"https://loadtest/c{n}.png"} for n in range(1, 7)]),
+        (CampaignLocation, [{"id": n, "name": f"Location {n}"} for n in range(1, 11)]),
+        (CampaignCategory, [{"id": n, "name": f"Category {n}", "image_url": f"https://loadtest/c{n}.png"} for n in range(1, 7)]),
+        (Tourism, [{"id": tourism_id(n), "name": f"{rng.choice(WORDS).title()} {n}", "image_url": f"https://loadtest/t{n}.png",
+                    "location_id": rng.randint(1, 10), "category_id": rng.randint(1, 6)} for n in range(1, TOURISMS + 1)]),
+        (TourismDetail, [{"tourism_id": tourism_id(n), "description": " ".join(rng.choices(WORDS, k=60))} for n in range(1, TOURISMS + 1)]),
+        (Campaign, [{"id": n, "name": f"Campaign {rng.choice(WORDS)} {n}", "image_url": f"https://loadtest/k{n}.png",
+                     "location_id": rng.randint(1, 10), "category_id": rng.randint(1, 6),
+                     "_start_date": today - timedelta(days=rng.randint(-30, 60)), "_end_date": today + timedelta(days=rng.randint(-30, 90))}
+                    for n in range(1, CAMPAIGNS + 1)]),
+        (CampaignDetails, [{"id": n, "initiator_id": user_id(rng.randint(1, USERS)), "description": "d", "terms": "t", "mission": "m", "campaign_id": n}
+                           for n in range(1, CAMPAIGNS + 1)]),
+        (CampaignParticipant, [{"user_id": user_id(u), "campaign_id": n} for n in range(1, CAMPAIGNS + 1)
+                               for u in rng.sample(range(1, USERS + 1), min(20, USERS))]),
+        (Forum, [{"id": n, "title": f"Forum {n}", "text": " ".join(rng.choices(WORDS, k=40)), "author_id": user_id(rng.randint(1, USERS)),
+                  "created_at": datetime.now() - timedelta(minutes=n)} for n in range(1, FORUMS + 1)]),
+        (Comment, [{"text": "Nice trip", "author_id": user_id(rng.randint(1, USERS)), "forum_id": rng.randint(1, FORUMS)} for _ in range(FORUMS * 3)]),
+        (ForumLike, [{"forum_id": forum_id, "user_id": user_id(u)} for forum_id, u in
+                     {(rng.randint(1, FORUMS), rng.randint(1, USERS)) for _ in range(FORUMS * 5)}]),
+        (OpenTrip, [{"id": n, "title": f"Trip {n}", "description": "d", "price": rng.randint(1, 9) * 1000000 + 500000, "organizer": "o",
+                     "trip_start": datetime(2024, 1, 1) + timedelta(days=n), "trip_end": datetime(2024, 1, 4) + timedelta(days=n),
+                     "regis_deadline": datetime(2023, 12, 1) + timedelta(days=n), "phone_number": "0800"} for n in range(1, 51)]),
+        (TripDestination, [{"name": f"Destination {n}", "location_name": "l", "image_url": f"https://loadtest/d{n % 7}.png",
+                            "category": rng.choice(["beach", "hill"]), "trip_id": 1 + n % 50} for n in range(150)])
+    ]
+    for model, values in rows:
+        db.session.execute(insert(model), values)
+    db.session.commit()
+
+def create_app():
+    """Builds the app of main.py against a seeded SQLite database, with Firebase, Cloud Storage and the ML services stubbed."""
+    environ.setdefault("DATABASE_URI", f"sqlite:///{DATABASE}")
+    from main import app
+    from api.v1.extensions import db
+
+    install_stubs()
+    with app.app_context():
+        seed(db)
+    return app
@@ -0,0 +1,4 @@
+from .offline import create_app
+
+# Served by gunicorn with PRELOAD_APP, so the database is seeded once before the workers fork
+app = create_app()
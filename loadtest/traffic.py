@@ -0,0 +1,147 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from .offline import CAMPAIGNS, FORUMS, TOURISMS, USERS, WORDS, tourism_id, user_id
+
+# name: (weight, request builder, statuses counted as success)
+SCENARIOS = {
+    "feed": (30, lambda rng: ("GET", f"/forums?page={rng.randint(1, 5)}", None), {200}),
+    "forum_detail": (6, lambda rng: ("GET", f"/forums/{rng.randint(1, FORUMS)}", None), {200}),
+    "forum_comments": (4, lambda rng: ("GET", f"/forums/{rng.randint(1, FORUMS)}/comments?page=1", None), {200}),
+    "tourism_browse": (14, lambda rng: ("GET", f"/tourisms?page={rng.randint(1, 10)}&category_id={rng.randint(1, 6)}", None), {200}),
+    "tourism_search": (8, lambda rng: ("GET", f"/tourisms?page=1&search={rng.choice(WORDS)}", None), {200}),
+    "tourism_detail": (8, lambda rng: ("GET", f"/tourisms/{tourism_id(rng.randint(1, TOURISMS))}/details", None), {200}),
+    "campaign_browse": (8, lambda rng: ("GET", f"/campaigns?page=1&status={rng.choice(['ongoing', 'coming-soon', 'completed'])}", None), {200}),
+    "campaign_detail": (4, lambda rng: ("GET", f"/campaigns/{rng.randint(1, CAMPAIGNS)}", None), {200}),
+    "trip_search": (3, lambda rng: ("GET", f"/open-trips?page=1&max_price={rng.randint(2, 10)}000000&open_only=true&sort=price", None), {200}),
+    "like": (7, lambda rng: ("POST", f"/forums/{rng.randint(1, FORUMS)}/likes", None), {200, 409}),
+    "comment": (4, lambda rng: ("POST", f"/forums/{rng.randint(1, FORUMS)}/comments", {"text": "Looks fun"}), {200}),
+    "registration": (3, lambda rng: ("POST", f"/campaigns/{rng.randint(1, CAMPAIGNS)}/registrations", None), {201, 409}),
+    "recommendations": (2, lambda rng: ("GET", "/tourism-recommendations", None), {200}),
+    "categories": (2, lambda rng: ("GET", "/tourism-categories", None), {200})
+}
+
+def parse_mix(mix):
+    """Parses 'feed=30,like=5' into scenario weights, the scenarios left out keep their default weight."""
+    weights = {name: weight for name, (weight, _, _) in SCENARIOS.items()}
+    for item in (mix or "").split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name.strip()}, expected one of {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+class InProcessTarget:
+    """Calls the app through the WSGI test client, so the server and the network are left out."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, headers, json):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        response = self.local.client.open(f"/api/v1{path}", method=method, headers=headers, json=json)
+        response.get_data()
+        return response.status_code
+
+class HttpTarget:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.local = threading.local()
+
+    def request(self, method, path, headers, json):
+        if not hasattr(self.local, "session"):
+            from requests import Session
+            self.local.session = Session()
+        response = self.local.session.request(method, f"{self.url}/api/v1{path}", headers=headers, json=json, timeout=60)
+        response.content
+        return response.status_code
+
+def run(target, weights, concurrency, rate, duration, seed=None):
+    """Replays the weighted mix for duration seconds and returns the samples as (scenario, latency, status).
+
+    Without a rate, concurrency users send their next request as soon as the previous one returns (closed loop).
+    With a rate, requests arrive as a Poisson process whatever the response times are (open loop), and their
+    latency is measured from the scheduled arrival, so the time spent waiting for a free worker counts too.
+    """
+    names = list(weights)
+    samples = []
+    lock = threading.Lock()
+
+    def send(rng, name, scheduled):
+        method, path, json = SCENARIOS[name][1](rng)
+        headers = {"Authorization": f"Bearer {user_id(rng.randint(1, USERS))}", "Accept-Encoding": "gzip"}
+        try:
+            status = target.request(method, path, headers, json)
+        except Exception:
+            status = None
+        sample = (name, perf_counter() - scheduled, status)
+        with lock:
+            samples.append(sample)
+
+    start = perf_counter()
+    deadline = start + duration
+    if rate:
+        rng = random.Random(seed)
+        with ThreadPoolExecutor(concurrency) as executor:
+            arrival = start
+            while True:
+                arrival += rng.expovariate(rate)
+                if arrival >= deadline:
+                    break
+                sleep(max(0, arrival - perf_counter()))
+                name = rng.choices(names, [weights[name] for name in names])[0]
+                executor.submit(send, random.Random(rng.random()), name, arrival)
+    else:
+        def user(number):
+            rng = random.Random(None if seed is None else seed + number)
+            while perf_counter() < deadline:
+                send(rng, rng.choices(names, [weights[name] for name in names])[0], perf_counter())
+
+        threads = [threading.Thread(target=user, args=(number,)) for number in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return samples, perf_counter() - start
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def summarize(latencies, errors, statuses, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        "statuses": statuses
+    }
+
+def report(samples, elapsed):
+    scenarios = {}
+    for name, latency, status in samples:
+        scenario = scenarios.setdefault(name, {"latencies": [], "errors": 0, "statuses": {}})
+        scenario["latencies"].append(latency)
+        scenario["errors"] += status not in SCENARIOS[name][2]
+        scenario["statuses"][str(status)] = scenario["statuses"].get(str(status), 0) + 1
+
+    total_statuses = {}
+    for scenario in scenarios.values():
+        for status, count in scenario["statuses"].items():
+            total_statuses[status] = total_statuses.get(status, 0) + count
+
+    return {
+        "total": summarize([latency for _, latency, _ in samples], sum(s["errors"] for s in scenarios.values()), total_statuses, elapsed),
+        "scenarios": {name: summarize(s["latencies"], s["errors"], s["statuses"], elapsed) for name, s in sorted(scenarios.items())}
+    }
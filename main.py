@@ -1,19 +1,88 @@
+from startup import start_profiler
+
+profiler = start_profiler()
+
 from api.v1 import v1
-from api.v1.extensions import db
+from api.v1.extensions import db, admission, cache, clients, compression, request_profiler
+from api.v1.importer import importer
+from api.v1.jobs import sentiment_jobs, sentiment_queue
+from api.v1.migrations import migrations
+from api.v1.profiling import profiling
 from flask import Flask
-from firebase_admin import initialize_app
-from credentials import credentials
+from credentials import get_credentials
 from os import getenv
 
+def create_firebase_app():
+    from firebase_admin import initialize_app
+    return initialize_app(get_credentials())
+
+def delete_firebase_app(firebase_app):
+    from firebase_admin import delete_app
+    delete_app(firebase_app)
+
 app = Flask(__name__)
 app.config["SQLALCHEMY_DATABASE_URI"] = getenv("DATABASE_URI")
+if not (getenv("DATABASE_URI") or "").startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": int(getenv("DB_POOL_SIZE", getenv("THREADS", 8))),
+        "max_overflow": int(getenv("DB_MAX_OVERFLOW", 2)),
+        "pool_timeout": int(getenv("DB_POOL_TIMEOUT", 10)),
+        "pool_pre_ping": True
+    }
+if getenv("REPLICA_DATABASE_URI"):
+    app.config["SQLALCHEMY_BINDS"] = {"replica": getenv("REPLICA_DATABASE_URI")}
+app.config["REPLICA_LAG_TOLERANCE"] = float(getenv("REPLICA_LAG_TOLERANCE", 5))
+app.config["ADMISSION_THREADS"] = int(getenv("THREADS", 8))
+app.config["ADMISSION_CRITICAL_RESERVED"] = int(getenv("ADMISSION_CRITICAL_RESERVED", 2))
+app.config["ADMISSION_QUEUE_SIZE"] = int(getenv("ADMISSION_QUEUE_SIZE", 8))
+app.config["ADMISSION_QUEUE_TIMEOUT"] = float(getenv("ADMISSION_QUEUE_TIMEOUT", 5))
+app.config["OUTBOUND_TIMEOUT"] = float(getenv("OUTBOUND_TIMEOUT", 10))
+app.config["COMPRESS_MIN_SIZE"] = int(getenv("COMPRESS_MIN_SIZE", 1024))
+app.config["COMPRESS_LEVEL"] = int(getenv("COMPRESS_LEVEL", 5))
+app.config["COMPRESS_BR_LEVEL"] = int(getenv("COMPRESS_BR_LEVEL", 4))
+app.config["CACHE_BACKEND"] = getenv("CACHE_BACKEND", "local")
+app.config["CACHE_DIR"] = getenv("CACHE_DIR", "/dev/shm/traversee-cache")
+app.config["CACHE_URL"] = getenv("CACHE_URL")
+app.config["CACHE_MAX_ENTRIES"] = int(getenv("CACHE_MAX_ENTRIES", 1024))
+app.config["PROFILE_CACHE_TTL"] = int(getenv("PROFILE_CACHE_TTL", 300))
+app.config["FEED_CACHED_PAGES"] = int(getenv("FEED_CACHED_PAGES", 3))
+app.config["FEED_CACHE_TTL"] = int(getenv("FEED_CACHE_TTL", 60))
+app.config["FACETS_CACHE_TTL"] = int(getenv("FACETS_CACHE_TTL", 300))
+app.config["LIST_CACHE_TTL"] = int(getenv("LIST_CACHE_TTL", 300))
+app.config["METRICS_TOKEN"] = getenv("METRICS_TOKEN")
+app.config["PROFILE_DIR"] = getenv("PROFILE_DIR")
+app.config["PROFILE_TOKEN"] = getenv("PROFILE_TOKEN")
+app.config["PROFILE_SAMPLE_RATE"] = float(getenv("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_MODE"] = getenv("PROFILE_MODE", "sample")
+app.config["PROFILE_INTERVAL"] = float(getenv("PROFILE_INTERVAL", 0.005))
+app.config["PROFILE_KEEP"] = int(getenv("PROFILE_KEEP", 100))
+app.config["SENTIMENT_QUEUE"] = getenv("SENTIMENT_QUEUE")
+app.config["SENTIMENT_BATCH_SIZE"] = int(getenv("SENTIMENT_BATCH_SIZE", 20))
+app.config["SENTIMENT_CONCURRENCY"] = int(getenv("SENTIMENT_CONCURRENCY", 4))
+app.config["SENTIMENT_MAX_ATTEMPTS"] = int(getenv("SENTIMENT_MAX_ATTEMPTS", 5))
+app.config["SENTIMENT_RETRY_DELAY"] = float(getenv("SENTIMENT_RETRY_DELAY", 30))
+if getenv("REPLICA_DATABASE_URI") and app.config["CACHE_BACKEND"] == "local":
+    # The writes:<uid> pins that keep a user on the primary after a write have to reach every worker
+    raise RuntimeError("REPLICA_DATABASE_URI requires CACHE_BACKEND=shared or redis")
 app.register_blueprint(v1, url_prefix="/api/v1")
 
 db.init_app(app)
-firebase = initialize_app(credentials)
+cache.init_app(app)
+admission.init_app(app)
+compression.init_app(app)
+request_profiler.init_app(app)
+sentiment_queue.init_app(app)
+app.cli.add_command(importer)
+app.cli.add_command(migrations)
+app.cli.add_command(profiling)
+app.cli.add_command(sentiment_jobs)
+clients.register("firebase", create_firebase_app, close=delete_firebase_app)
+profiler.attach(app)
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
 
-    app.run(host="0.0.0.0", port=8080)
+    # Under gunicorn the clients are warmed up by post_fork in each worker, never in the master before it forks
+    clients.warm_up(getenv("WARMUP_CLIENTS"))
+    app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
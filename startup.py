@@ -0,0 +1,68 @@
+import builtins
+import sys
+from importlib.util import resolve_name
+from os import getenv
+from time import perf_counter
+
+class StartupProfiler:
+    def __init__(self, enabled, limit=25):
+        self.enabled = enabled
+        self.limit = limit
+        self.started_at = perf_counter()
+        self.ready_at = None
+        self.first_request_at = None
+        self.imports = {}
+        self._stack = []
+        self._import = builtins.__import__
+        if enabled:
+            builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        try:
+            module_name = resolve_name("." * level + name, (globals or {}).get("__package__")) if level else name
+        except (ImportError, ValueError):
+            module_name = name
+        if module_name in sys.modules or module_name in self.imports:
+            return self._import(name, globals, locals, fromlist, level)
+
+        start = perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.imports[module_name] = (elapsed, elapsed - children)
+
+    def attach(self, app):
+        if not self.enabled:
+            return
+        builtins.__import__ = self._import
+        self.ready_at = perf_counter()
+
+        @app.before_request
+        def record_first_request():
+            if self.first_request_at is None:
+                self.first_request_at = perf_counter()
+
+        @app.after_request
+        def report_first_response(response):
+            if self.first_request_at is not None and self.ready_at is not None:
+                self.report(perf_counter())
+                self.ready_at = None
+            return response
+
+    def report(self, first_response_at):
+        lines = ["Startup profile (ms)", f"{'cumulative':>10} {'self':>10}  module"]
+        imports = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        for module_name, (cumulative, own) in imports[:self.limit]:
+            lines.append(f"{cumulative * 1000:10.1f} {own * 1000:10.1f}  {module_name}")
+        lines.append(f"App ready after {(self.ready_at - self.started_at) * 1000:.1f} ms")
+        lines.append(f"First request after {(self.first_request_at - self.started_at) * 1000:.1f} ms")
+        lines.append(f"First response after {(first_response_at - self.started_at) * 1000:.1f} ms")
+        print("\n".join(lines), file=sys.stderr, flush=True)
+
+def start_profiler():
+    return StartupProfiler(getenv("STARTUP_PROFILE", "").lower() in ("1", "true"), int(getenv("STARTUP_PROFILE_LIMIT", 25)))
\ No newline at end of file
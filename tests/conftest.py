@@ -0,0 +1,70 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from types import SimpleNamespace
+from api.v1 import v1
+from api.v1.extensions import cache, clients, db
+
+class UserNotFoundError(Exception):
+    pass
+
+def get_user(uid):
+    if uid.startswith("missing"):
+        raise UserNotFoundError(f"No user record found for the provided user ID: {uid}.")
+    return SimpleNamespace(uid=uid, display_name=f"User {uid}", photo_url=f"https://example.com/{uid}.jpeg")
+
+def get_users(identifiers):
+    return SimpleNamespace(users=[get_user(identifier.uid) for identifier in identifiers if not identifier.uid.startswith("missing")])
+
+# Firebase is replaced through the clients registry, the tokens are the user ids themselves
+fake_auth = SimpleNamespace(
+    verify_id_token=lambda token: {"uid": token, "user_id": token},
+    get_user=get_user,
+    get_users=get_users,
+    update_user=lambda uid, photo_url=None: SimpleNamespace(uid=uid, photo_url=photo_url),
+    UidIdentifier=lambda uid: SimpleNamespace(uid=uid),
+    UserNotFoundError=UserNotFoundError
+)
+
+@pytest.fixture(autouse=True)
+def auth():
+    clients.register("auth", lambda: fake_auth)
+    yield fake_auth
+    clients.reset()
+
+@pytest.fixture
+def make_app(tmp_path):
+    def make(**config):
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+        app.config["CACHE_BACKEND"] = "local"
+        app.config.update(config)
+        app.register_blueprint(v1, url_prefix="/api/v1")
+        db.init_app(app)
+        cache.init_app(app)
+        with app.app_context():
+            db.create_all()
+        return app
+    return make
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run by the app's primary engine, cleared by the test before the request it measures."""
+    executed = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda connection, cursor, statement, *args: executed.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield executed
+    event.remove(engine, "before_cursor_execute", listener)
+
+def headers(user_id="user-1"):
+    return {"Authorization": f"Bearer {user_id}"}
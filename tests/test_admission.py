@@ -0,0 +1,55 @@
+import pytest
+from flask import Flask
+from threading import Thread
+from time import sleep
+from api.v1.admission import Admission
+
+@pytest.fixture
+def admission():
+    app = Flask(__name__)
+    app.config.update(ADMISSION_THREADS=8, ADMISSION_CRITICAL_RESERVED=2, ADMISSION_QUEUE_SIZE=8, ADMISSION_QUEUE_TIMEOUT=5)
+    admission = Admission()
+    admission.init_app(app)
+    return admission
+
+def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        sleep(0.01)
+    raise AssertionError("condition not reached")
+
+def test_default_lane_queues_then_admits(admission):
+    lane = admission.lanes["default"]
+    for _ in range(lane["limit"]):
+        assert admission.acquire("default")
+
+    results = []
+    waiter = Thread(target=lambda: results.append(admission.acquire("default")))
+    waiter.start()
+    wait_for(lambda: lane["waiting"] == 1)
+    assert results == []
+
+    admission.release("default")
+    waiter.join(1)
+    assert results == [True]
+    assert lane["queued"] == 1
+    assert lane["running"] == lane["limit"]
+
+def test_rejects_beyond_capacity_and_keeps_critical_threads(admission):
+    admission.timeout = 0.5
+    lane = admission.lanes["default"]
+    for _ in range(lane["limit"]):
+        assert admission.acquire("default")
+
+    waiters = [Thread(target=admission.acquire, args=("default",)) for _ in range(admission.capacity - lane["limit"])]
+    for waiter in waiters:
+        waiter.start()
+    wait_for(lambda: lane["waiting"] == len(waiters))
+
+    # Every thread left for the other lanes is taken, the next request is rejected but the critical lane still runs
+    assert not admission.acquire("default")
+    assert lane["rejected"] == 1
+    assert admission.acquire("critical")
+    for waiter in waiters:
+        waiter.join()
@@ -0,0 +1,45 @@
+from threading import Barrier, Thread
+from time import sleep
+from api.v1.cache import Cache, SharedBackend
+
+def test_get_or_set_drops_its_locks_when_another_worker_fills_the_key(tmp_path):
+    # Two workers share the backend, the second one finds every key filled by the first
+    first, second = Cache(), Cache()
+    first.backend = second.backend = SharedBackend(str(tmp_path), 1024)
+    barrier = Barrier(2)
+
+    def slow(value):
+        sleep(0.05)
+        return value
+
+    def load(cache, key):
+        barrier.wait()
+        return cache.get_or_set(key, lambda: slow(key))
+
+    for n in range(20):
+        threads = [Thread(target=load, args=(cache, f"forums:1:page:{n}")) for cache in (first, second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert first._locks == {}
+    assert second._locks == {}
+    assert first.get("forums:1:page:3") == "forums:1:page:3"
+
+def test_get_or_set_computes_a_missing_key_once_per_process():
+    cache, calls = Cache(), []
+
+    def compute():
+        calls.append(1)
+        sleep(0.05)
+        return "value"
+
+    threads = [Thread(target=cache.get_or_set, args=("feed:key", compute)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert cache._locks == {}
@@ -0,0 +1,47 @@
+import pytest
+from datetime import date, timedelta
+from api.v1.extensions import db
+from api.v1.models.campaigns import Campaign, CampaignCategory, CampaignDetails, CampaignLocation, CampaignParticipant
+from conftest import headers
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add_all([CampaignLocation(id=1, name="Bali"), CampaignCategory(id=1, name="Clean", image_url="x")])
+        db.session.flush()
+        db.session.add(Campaign(id=1, name="Clean up", image_url="x", location_id=1, category_id=1,
+                                _start_date=date.today(), _end_date=date.today() + timedelta(days=7)))
+        db.session.flush()
+        db.session.add(CampaignDetails(initiator_id="user-9", description="d", terms="t", mission="m", campaign_id=1))
+        db.session.add_all([CampaignParticipant(user_id=f"user-{n}", campaign_id=1, submission_url="s" if n == 1 else None) for n in range(1, 4)])
+        db.session.commit()
+    return app
+
+def selects(statements):
+    return [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+
+def test_campaign_screen_is_one_query_plus_the_participants(client, statements):
+    statements.clear()
+    response = client.get("/api/v1/campaigns/1?include=details,participants", headers=headers("user-1"))
+
+    assert response.status_code == 200
+    assert len(selects(statements)) == 2
+    data = response.json["data"]
+    assert data["campaign"]["category_name"] == "Clean"
+    assert data["campaign"]["location_name"] == "Bali"
+    assert data["campaign"]["total_participants"] == 3
+    assert data["is_registered"] is True
+    assert data["details"]["submission_url"] == "s"
+    assert data["details"]["campaign_detail"]["initiator_name"] == "User user-9"
+    assert len(data["participants"][1]["other_participants"]) == 3
+
+def test_campaign_screen_of_a_user_who_isnt_registered(client):
+    response = client.get("/api/v1/campaigns/1?include=details", headers=headers("user-7"))
+
+    assert response.json["data"]["is_registered"] is False
+    assert response.json["data"]["campaign"]["total_participants"] == 3
+
+def test_campaign_screen_of_a_missing_campaign(client):
+    response = client.get("/api/v1/campaigns/2?include=details", headers=headers())
+    assert response.status_code == 404
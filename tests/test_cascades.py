@@ -0,0 +1,101 @@
+import click
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text
+from api.v1.extensions import db
+from api.v1.migrations import rebuild_sqlite_cascades
+from api.v1.models.forums import Comment, Forum, ForumLike
+from api.v1.models.open_trips import OpenTrip, TripDestination
+from conftest import headers
+
+def deletes(statements):
+    return [statement for statement in statements if statement.lstrip().upper().startswith("DELETE")]
+
+def test_forum_delete_cascades_in_one_statement(app, client, statements):
+    with app.app_context():
+        db.session.add(Forum(id=1, title="Trip", text="Lovely", author_id="user-1"))
+        db.session.flush()
+        db.session.add_all([Comment(text=f"Comment {n}", author_id="user-2", forum_id=1) for n in range(3)])
+        db.session.add_all([ForumLike(forum_id=1, user_id=f"user-{n}") for n in range(3)])
+        db.session.commit()
+
+    statements.clear()
+    response = client.delete("/api/v1/forums/1", headers=headers("user-1"))
+
+    assert response.status_code == 200
+    assert len(deletes(statements)) == 1
+    with app.app_context():
+        assert db.session.query(Comment).count() == 0
+        assert db.session.query(ForumLike).count() == 0
+
+def test_open_trip_delete_cascades_in_one_statement(app, client, statements):
+    with app.app_context():
+        db.session.add(OpenTrip(id=1, title="Trip", description="d", price=1500000, organizer="o", trip_start=datetime(2024, 1, 1),
+                                trip_end=datetime(2024, 1, 3), regis_deadline=datetime(2023, 12, 1), phone_number="0800"))
+        db.session.flush()
+        db.session.add_all([TripDestination(name=f"Destination {n}", trip_id=1) for n in range(3)])
+        db.session.commit()
+
+    statements.clear()
+    response = client.delete("/api/v1/open-trips/1", headers=headers())
+
+    assert response.status_code == 200
+    assert len(deletes(statements)) == 1
+    with app.app_context():
+        assert db.session.query(TripDestination).count() == 0
+
+OLD_SCHEMA = [
+    "CREATE TABLE forums (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL)",
+    "CREATE TABLE campaigns (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE open_trips (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE comments (id INTEGER PRIMARY KEY, text VARCHAR(300) NOT NULL, author_id VARCHAR NOT NULL, "
+    "forum_id INTEGER NOT NULL REFERENCES forums (id), sentiment JSON, created_at DATETIME)",
+    "CREATE TABLE forum_likes (forum_id INTEGER REFERENCES forums (id), user_id VARCHAR, PRIMARY KEY (forum_id, user_id))",
+    "CREATE TABLE forum_campaigns (forum_id INTEGER PRIMARY KEY REFERENCES forums (id), campaign_id INTEGER NOT NULL REFERENCES campaigns (id))",
+    "CREATE TABLE trip_destinations (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, location_name VARCHAR(100), image_url VARCHAR, "
+    "category VARCHAR(20), trip_id INTEGER NOT NULL REFERENCES open_trips (id))",
+    "CREATE INDEX ix_trip_destinations_category_trip_id ON trip_destinations (category, trip_id)"
+]
+
+def create_old_schema(connection):
+    for statement in OLD_SCHEMA:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql("INSERT INTO forums (id, title) VALUES (1, 'Trip'), (2, 'Other')")
+    connection.exec_driver_sql("INSERT INTO campaigns (id) VALUES (1)")
+    connection.exec_driver_sql("INSERT INTO open_trips (id) VALUES (1)")
+    connection.exec_driver_sql("INSERT INTO comments (text, author_id, forum_id) VALUES ('Nice', 'user-2', 1), ('Too', 'user-3', 2)")
+    connection.exec_driver_sql("INSERT INTO forum_likes (forum_id, user_id) VALUES (1, 'user-2'), (1, 'user-3')")
+    connection.exec_driver_sql("INSERT INTO forum_campaigns (forum_id, campaign_id) VALUES (1, 1)")
+    connection.exec_driver_sql("INSERT INTO trip_destinations (name, category, trip_id) VALUES ('Beach', 'beach', 1)")
+
+def count(connection, table):
+    return connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+def test_sqlite_migration_rebuilds_the_tables_with_cascades():
+    with create_engine("sqlite://").begin() as connection:
+        create_old_schema(connection)
+        rebuild_sqlite_cascades(connection)
+
+        assert count(connection, "comments") == 2
+        assert count(connection, "forum_likes") == 2
+        assert "ix_trip_destinations_category_trip_id" in {index["name"] for index in inspect(connection).get_indexes("trip_destinations")}
+
+        connection.exec_driver_sql("DELETE FROM forums WHERE id = 1")
+        connection.exec_driver_sql("DELETE FROM open_trips WHERE id = 1")
+        assert count(connection, "comments") == 1
+        assert count(connection, "forum_likes") == 0
+        assert count(connection, "forum_campaigns") == 0
+        assert count(connection, "trip_destinations") == 0
+
+def test_sqlite_migration_stops_on_orphan_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.connect() as connection:
+        # Rows written before foreign keys were enforced may point at deleted forums
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        create_old_schema(connection)
+        connection.exec_driver_sql("INSERT INTO forum_likes (forum_id, user_id) VALUES (9, 'user-2')")
+        connection.commit()
+
+    with engine.begin() as connection:
+        with pytest.raises(click.ClickException, match="forum_likes"):
+            rebuild_sqlite_cascades(connection)
@@ -0,0 +1,52 @@
+import gzip
+from flask import Flask
+from api.v1.compression import Compression
+from api.v1.extensions import cache, db
+from api.v1.models.forums import Forum, ForumLike
+from conftest import headers
+
+def test_streamed_response_is_flushed_per_chunk():
+    app = Flask(__name__)
+    Compression().init_app(app)
+    chunks = ['{"data":[', *[f'{{"id": {id}, "name": "item {id}"}},' for id in range(5)], "{}]}"]
+
+    @app.route("/items")
+    def items():
+        return app.response_class(iter(chunks), mimetype="application/json")
+
+    response = app.test_client().get("/items", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert response.headers["Content-Encoding"] == "gzip"
+    sent = list(response.response)
+    # Each chunk of the body reaches the client on its own, not only the gzip header before a final flush
+    assert len([data for data in sent if data]) >= len(chunks)
+    assert gzip.decompress(b"".join(sent)).decode() == "".join(chunks)
+
+def test_feed_pages_are_not_cached_compressed_per_user(make_app):
+    app = make_app(COMPRESS_MIN_SIZE=0)
+    Compression().init_app(app)
+    with app.app_context():
+        db.session.add(Forum(id=1, title="Trip", text="Lovely " * 100, author_id="user-1"))
+        db.session.flush()
+        db.session.add(ForumLike(forum_id=1, user_id="user-1"))
+        db.session.commit()
+
+    client = app.test_client()
+    for user_id in ("user-1", "user-2"):
+        response = client.get("/api/v1/forums?page=1", headers={**headers(user_id), "Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+
+    # The page itself is cached once, the bodies with each user's likes aren't
+    keys = list(cache.backend._entries)
+    assert len([key for key in keys if ":feed:" in key]) == 1
+    assert [key for key in keys if ":compressed:" in key] == []
+
+def test_shared_facets_are_cached_compressed(make_app):
+    app = make_app(COMPRESS_MIN_SIZE=0)
+    Compression().init_app(app)
+
+    client = app.test_client()
+    for user_id in ("user-1", "user-2"):
+        response = client.get("/api/v1/tourism-facets", headers={**headers(user_id), "Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+
+    assert len([key for key in cache.backend._entries if ":compressed:" in key]) == 1
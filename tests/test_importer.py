@@ -0,0 +1,27 @@
+import json
+from api.v1.extensions import db
+from api.v1.importer import importer
+from api.v1.models.campaigns import Campaign, CampaignCategory, CampaignLocation
+
+def campaign(id, **fields):
+    return {"id": id, "name": f"Campaign {id}", "image_url": "x", "location_id": 1, "category_id": 1,
+            "start_date": "2024-01-01", "end_date": "2024-01-31", **fields}
+
+def test_rows_with_values_of_the_wrong_type_are_skipped(app, tmp_path):
+    app.cli.add_command(importer)
+    with app.app_context():
+        db.session.add_all([CampaignLocation(id=1, name="Bali"), CampaignCategory(id=1, name="Clean", image_url="x")])
+        db.session.commit()
+
+    rows = [campaign(1), campaign(2, start_date=20240101), campaign(3, location_id=[1]), campaign(4)]
+    path = tmp_path / "campaigns.jsonl"
+    path.write_text("\n".join(map(json.dumps, rows)))
+
+    result = app.test_cli_runner().invoke(args=["import", "data", "campaigns", str(path)])
+
+    assert result.exception is None
+    assert "Skipped line 2" in result.output
+    assert "Skipped line 3" in result.output
+    assert "Imported 2 campaigns" in result.output
+    with app.app_context():
+        assert sorted(id for id, in db.session.query(Campaign.id)) == [1, 4]
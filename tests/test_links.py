@@ -0,0 +1,89 @@
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import event
+from api.v1.extensions import db
+from api.v1.models.campaigns import Campaign, CampaignCategory, CampaignLocation
+from api.v1.models.forums import Forum
+from api.v1.models.tourisms import Tourism, TourismCategory, TourismLocation
+from conftest import headers
+
+LINKS = ["/api/v1/campaigns/1/registrations", "/api/v1/forums/1/likes", "/api/v1/tourisms/T1/favorites"]
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add_all([CampaignLocation(id=1, name="Bali"), CampaignCategory(id=1, name="Clean", image_url="x"),
+                            TourismLocation(id=1, name="Bali"), TourismCategory(id=1, name="Beach", image_url="x"),
+                            Forum(id=1, title="Trip", text="Lovely", author_id="user-2")])
+        db.session.flush()
+        db.session.add_all([Campaign(id=1, name="Clean up", image_url="x", location_id=1, category_id=1,
+                                     _start_date=date.today(), _end_date=date.today() + timedelta(days=7)),
+                            Tourism(id="T1", name="Pantai", image_url="x", location_id=1, category_id=1)])
+        db.session.commit()
+    return app
+
+@pytest.fixture
+def errors(app):
+    raised = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda context: raised.append(context.original_exception)
+    event.listen(engine, "handle_error", listener)
+    yield raised
+    event.remove(engine, "handle_error", listener)
+
+def inserts(statements):
+    return [statement for statement in statements if statement.lstrip().upper().startswith("INSERT")]
+
+@pytest.mark.parametrize("url", LINKS)
+def test_link_is_one_insert_and_a_retry_conflicts(client, statements, errors, url):
+    statements.clear()
+    response = client.post(url, headers=headers())
+    assert response.status_code in (200, 201)
+    assert len(inserts(statements)) == 1
+
+    statements.clear()
+    response = client.post(url, headers=headers())
+    assert response.status_code == 409
+    assert len(inserts(statements)) == 1
+    assert errors == []
+
+def test_submission_is_one_insert_and_a_retry_updates_it(client, statements, errors):
+    statements.clear()
+    response = client.post("/api/v1/campaigns/1/submissions", headers=headers(), json={"submission_url": "https://example.com/a"})
+    assert response.status_code == 201
+    assert len(inserts(statements)) == 1
+
+    statements.clear()
+    response = client.post("/api/v1/campaigns/1/submissions", headers=headers(), json={"submission_url": "https://example.com/b"})
+    assert response.status_code == 201
+    assert response.json["data"]["submission_url"] == "https://example.com/b"
+    assert len(inserts(statements)) == 1
+    assert errors == []
+
+def test_like_and_favorite_responses_take_one_select(client, statements):
+    for url in ("/api/v1/forums/1/likes", "/api/v1/tourisms/T1/favorites"):
+        statements.clear()
+        response = client.post(url, headers=headers())
+        assert response.status_code == 200
+        assert len(statements) == 2
+
+    assert response.json["data"]["tourism"]["category_name"] == "Beach"
+
+def test_like_response_counts_the_new_like(client):
+    response = client.post("/api/v1/forums/1/likes", headers=headers())
+    assert response.json["data"]["total_likes"] == 1
+    assert response.json["data"]["user_display_name"] == "User user-2"
+
+@pytest.mark.parametrize("url, key, id", [
+    ("/api/v1/forums/likes", "forum_id", "x"),
+    ("/api/v1/forums/likes", "forum_id", "1"),
+    ("/api/v1/forums/likes", "forum_id", True),
+    ("/api/v1/tourisms/favorites", "tourism_id", 5),
+    ("/api/v1/tourisms/favorites", "tourism_id", ["T1"])
+])
+def test_batch_rejects_ids_of_the_wrong_type(client, url, key, id):
+    response = client.post(url, headers=headers(), json={"operations": [{key: id, "method": "POST"}, {key: 1 if key == "forum_id" else "T1", "method": "POST"}]})
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["data"]] == [400, 200]
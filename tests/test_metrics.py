@@ -0,0 +1,19 @@
+import pytest
+from conftest import headers
+
+@pytest.fixture
+def app(make_app):
+    return make_app(METRICS_TOKEN="secret")
+
+def test_metrics_require_the_metrics_token(client):
+    response = client.get("/api/v1/metrics", headers={"X-Metrics-Token": "secret"})
+    assert response.status_code == 200
+    assert "admission" in response.json["data"]
+
+@pytest.mark.parametrize("request_headers", [headers(), {"X-Metrics-Token": "wrong"}, {}])
+def test_metrics_reject_app_users_and_wrong_tokens(client, request_headers):
+    assert client.get("/api/v1/metrics", headers=request_headers).status_code == 403
+
+def test_metrics_are_closed_without_a_configured_token(make_app):
+    client = make_app().test_client()
+    assert client.get("/api/v1/metrics", headers={"X-Metrics-Token": ""}).status_code == 403
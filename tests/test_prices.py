@@ -0,0 +1,51 @@
+import click
+import pytest
+from decimal import Decimal
+from sqlalchemy import create_engine, text
+from api.v1.helper import parse_price
+from api.v1.migrations import convert_trip_prices
+from conftest import headers
+
+@pytest.mark.parametrize("value, price", [
+    ("Rp 1.500.000", Decimal("1500000")),
+    ("Rp. 150.000,-", Decimal("150000")),
+    ("1,500,000.50", Decimal("1500000.50")),
+    ("1.500.000,50", Decimal("1500000.50")),
+    ("2,5", Decimal("2.5")),
+    (1500000, Decimal("1500000")),
+    ("", None)
+])
+def test_parses_single_amounts(value, price):
+    assert parse_price(value) == price
+
+@pytest.mark.parametrize("value", [
+    "1-2 juta", "Rp 2,5 juta", "mulai 500rb", "300k", "Rp 1.000.000 - 2.000.000",
+    "1.2.3", "12.345.67", "0,125", "-5", True, "99999999999", "12.3456", 1.005
+])
+def test_rejects_ranges_units_and_out_of_range_amounts(value):
+    with pytest.raises(ValueError):
+        parse_price(value)
+
+def test_create_trip_rejects_a_price_range(client):
+    response = client.post("/api/v1/open-trips", headers=headers(), json={
+        "title": "Trip", "description": "d", "price": "Rp 1.000.000 - 2.000.000", "organizer": "o",
+        "trip_start": "2024-01-01", "trip_end": "2024-01-03", "regis_deadline": "2023-12-01", "phone_number": "0800"
+    })
+    assert response.status_code == 400
+
+def create_old_schema(connection, prices):
+    connection.execute(text("CREATE TABLE open_trips (id INTEGER PRIMARY KEY, price VARCHAR, trip_start DATETIME, trip_end DATETIME, regis_deadline DATETIME)"))
+    connection.execute(text("CREATE TABLE trip_destinations (id INTEGER PRIMARY KEY, category VARCHAR(20), trip_id INTEGER)"))
+    connection.execute(text("INSERT INTO open_trips (id, price) VALUES (:id, :price)"), [{"id": id, "price": price} for id, price in prices.items()])
+
+def test_migration_stops_on_free_form_prices():
+    with create_engine("sqlite://").connect() as connection:
+        create_old_schema(connection, {1: "Rp 1.500.000", 2: "1-2 juta", 3: "mulai 500rb"})
+        with pytest.raises(click.ClickException, match="2, 3"):
+            convert_trip_prices(connection)
+
+def test_migration_converts_prices():
+    with create_engine("sqlite://").connect() as connection:
+        create_old_schema(connection, {1: "Rp 1.500.000", 2: "750.000,50"})
+        convert_trip_prices(connection)
+        assert dict(connection.execute(text("SELECT id, price FROM open_trips")).all()) == {1: 1500000, 2: 750000.5}
@@ -0,0 +1,41 @@
+import pytest
+from api.v1 import replica
+from api.v1.extensions import db
+from api.v1.models.tourisms import Tourism, TourismCategory, TourismLocation
+from conftest import headers
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    app = make_app(SQLALCHEMY_BINDS={"replica": f"sqlite:///{tmp_path / 'replica.db'}"})
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica"])
+        # The same category is named after the database it is read from
+        for name, engine in (("primary", db.engine), ("replica", db.engines["replica"])):
+            with engine.begin() as connection:
+                connection.execute(TourismCategory.__table__.insert(), {"id": 1, "name": name, "image_url": "x"})
+        db.session.add_all([TourismLocation(id=1, name="Bali"), Tourism(id="T1", name="Pantai", image_url="x", location_id=1, category_id=1)])
+        db.session.commit()
+    return app
+
+def category_source(client, user_id="user-1"):
+    response = client.get("/api/v1/tourism-categories", headers=headers(user_id))
+    assert response.status_code == 200
+    return response.json["data"][0]["name"]
+
+def test_get_reads_from_the_replica(client):
+    assert category_source(client) == "replica"
+
+def test_write_and_its_reads_go_to_the_primary(client):
+    # T1 only exists on the primary, so both the insert and the tourism read after it have to use the primary
+    response = client.post("/api/v1/tourisms/T1/favorites", headers=headers())
+    assert response.status_code == 200
+    assert response.json["data"]["tourism"]["id"] == "T1"
+
+def test_writer_reads_from_the_primary_until_the_pin_expires(client):
+    client.post("/api/v1/tourisms/T1/favorites", headers=headers("writer"))
+    assert category_source(client, "writer") == "primary"
+    assert category_source(client, "reader") == "replica"
+
+def test_lagging_replica_falls_back_to_the_primary(client, monkeypatch):
+    monkeypatch.setattr(replica, "replica_in_sync", lambda engine: False)
+    assert category_source(client) == "primary"